@@ -10,7 +10,14 @@ import sys
 import json
 import unicodedata
 import asyncio
+import base64
+import codecs
+import collections
+import collections.abc
+import concurrent.futures
+import functools
 import threading
+import traceback
 import subprocess
 import signal
 import atexit
@@ -18,8 +25,13 @@ import socket
 import platform
 import uuid
 import hashlib
+import importlib.util
+import io
 import re
+import selectors
+import shutil
 from datetime import datetime, timezone
+from importlib.metadata import version as package_version, PackageNotFoundError
 from pathlib import Path
 from typing import Dict, Any, Optional, List, Tuple, Union
 try:
@@ -31,12 +43,35 @@ except Exception:  # pragma: no cover - keyring should be available via requirem
     class KeyringError(Exception):
         """Fallback KeyringError when keyring is unavailable."""
         pass
+try:
+    import winreg
+except ImportError:  # Non-Windows platforms
+    winreg = None
+try:
+    import orjson
+    _jloads = orjson.loads
+except ImportError:  # Optional speedup; stdlib json parses the same documents
+    orjson = None
+    _jloads = json.loads
 from server import PromptServer
+import aiohttp
 from aiohttp import web
 
+
+def _jdumps(obj: Any) -> str:
+    """Compact JSON text for env vars and argv (orjson when available)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj, separators=(',', ':'))
+
+
 # Use both logging and print for debugging
 logger = logging.getLogger(__name__)
-LOG_DIR = os.path.join(os.path.dirname(__file__), 'web', 'logs')
+_IS_WINDOWS = platform.system().lower() == 'windows'
+WEB_DIR = os.path.join(os.path.dirname(__file__), 'web')
+# Constant tail of every task's PYTHONPATH (web_dir holds setup_modules)
+_WEB_DIR_PATHSEP = WEB_DIR + os.pathsep
+LOG_DIR = os.path.join(WEB_DIR, 'logs')
 PIP_LOG_PATH = os.path.join(LOG_DIR, 'setup.log')
 
 def _log_pip_output(label: str, content: Optional[str]) -> None:
@@ -55,10 +90,37 @@ def _log_pip_output(label: str, content: Optional[str]) -> None:
         logger.warning("Nitra: Failed to write pip logs: %s", log_error)
 
 # Configuration - Automatically detect from git branch
+_GIT_HEAD_REF_RE = re.compile(r'^ref:\s*refs/heads/(.+?)\s*$')
+
+
+def _read_git_head_branch() -> Optional[str]:
+    """Read the current branch straight from .git/HEAD without spawning git."""
+    git_path = Path(__file__).parent / '.git'
+    if git_path.is_file():
+        # Worktrees/submodules store a "gitdir: <path>" pointer instead of a directory
+        pointer = git_path.read_text(encoding='utf-8').strip()
+        if not pointer.startswith('gitdir:'):
+            return None
+        git_path = (git_path.parent / pointer[len('gitdir:'):].strip()).resolve()
+    head = (git_path / 'HEAD').read_text(encoding='utf-8').strip()
+    match = _GIT_HEAD_REF_RE.match(head)
+    if match:
+        return match.group(1)
+    if re.fullmatch(r'[0-9a-fA-F]{40,64}', head):
+        return 'HEAD'  # Detached HEAD, same as `git rev-parse --abbrev-ref HEAD`
+    return None
+
+
+@functools.lru_cache(maxsize=1)
 def get_git_branch() -> str:
-    """Detect the current git branch"""
+    """Detect the current git branch (cached for the lifetime of the process)"""
+    try:
+        branch = _read_git_head_branch()
+        if branch:
+            return branch
+    except Exception:
+        pass
     try:
-        import subprocess
         result = subprocess.run(
             ['git', 'rev-parse', '--abbrev-ref', 'HEAD'],
             cwd=os.path.dirname(__file__),
@@ -72,8 +134,9 @@ def get_git_branch() -> str:
         pass
     return 'main'  # Default fallback
 
+@functools.lru_cache(maxsize=1)
 def load_config():
-    """Load configuration based on git branch"""
+    """Load configuration based on git branch (computed once per process)"""
     # Branch to URL mapping
     branch_urls = {
         'main': 'https://app.nitralabs.ai',
@@ -110,10 +173,17 @@ USE_LOCAL_SCRIPTS = config['use_local_scripts']
 
 DEVICE_TOKEN_KEYRING_SERVICE = "comfyui-nitra-device-token"
 _cached_device_token: Optional[str] = None
+# Parsed device_state.json keyed by its (mtime_ns, size), so building upstream headers on
+# every request costs a stat() rather than an open + JSON parse
+_device_state_cache: Optional[Tuple[Tuple[int, int], Dict[str, Any]]] = None
+# (device_token, fingerprint_hash) under the same file signature; dropped whenever the
+# state file or the stored token changes in-process
+_device_context_cache: Optional[Tuple[Optional[Tuple[int, int]], Tuple[Optional[str], Optional[str]]]] = None
+_device_state_path: Optional[str] = None
 
 
-def detect_nvcc_driver_version() -> Tuple[Optional[str], Optional[str], Optional[str]]:
-    """Detect nvcc version by probing common locations."""
+def _nvcc_candidates() -> List[str]:
+    """Return nvcc locations to probe, most specific first."""
     candidates: List[str] = []
     if os.name == 'nt':
         for key, value in os.environ.items():
@@ -124,40 +194,146 @@ def detect_nvcc_driver_version() -> Tuple[Optional[str], Optional[str], Optional
         candidates.append('/usr/local/cuda/bin/nvcc')
 
     candidates.append('nvcc')
-    seen = set()
+    return list(dict.fromkeys(candidate for candidate in candidates if candidate))
 
-    for candidate in candidates:
-        if not candidate or candidate in seen:
-            continue
-        seen.add(candidate)
 
+# The CUDA toolkit location does not change while the server is running
+_NVCC_CANDIDATES = _nvcc_candidates()
+_nvcc_detection: Optional[Tuple[str, str, str]] = None
+
+
+async def _run_tool(cmd: List[str], timeout: float, cwd: Optional[str] = None) -> Tuple[int, str, str]:
+    """Run an external tool without blocking the event loop; returns (returncode, stdout, stderr)."""
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            cwd=cwd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+    except NotImplementedError:
+        # Event loops without subprocess support (SelectorEventLoop on Windows) use a worker thread
+        result = await asyncio.to_thread(
+            subprocess.run, cmd, cwd=cwd, capture_output=True, text=True, timeout=timeout
+        )
+        return result.returncode, result.stdout or '', result.stderr or ''
+
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise
+    return (
+        process.returncode,
+        stdout.decode('utf-8', errors='replace'),
+        stderr.decode('utf-8', errors='replace'),
+    )
+
+
+async def _run_inherited_subprocess(cmd: List[str], env: Dict[str, str], cwd: str, timeout: float) -> int:
+    """Run a script with stdout/stderr going to our terminal without blocking the event loop; returns its exit code."""
+    try:
+        process = await asyncio.create_subprocess_exec(*cmd, env=env, cwd=cwd, stdout=None, stderr=None)
+    except NotImplementedError:
+        # Event loops without subprocess support (SelectorEventLoop on Windows) use a worker thread
+        result = await asyncio.to_thread(subprocess.run, cmd, env=env, cwd=cwd, timeout=timeout)
+        return result.returncode
+
+    try:
+        return await asyncio.wait_for(process.wait(), timeout=timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise
+
+
+# pip output is appended to the log in pieces of about this size, and this much of its
+# end is kept in memory for the error message
+PIP_LOG_FLUSH_CHARS = 16 * 1024
+PIP_OUTPUT_TAIL_CHARS = 8 * 1024
+
+
+async def _run_logged_pip(cmd: List[str], label: str, timeout: float) -> Tuple[int, str]:
+    """Run pip with stdout+stderr streamed into the pip log as it arrives; returns (returncode, output tail)."""
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+        )
+    except NotImplementedError:
+        # Event loops without subprocess support (SelectorEventLoop on Windows) use a worker thread
+        result = await asyncio.to_thread(
+            subprocess.run, cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, timeout=timeout
+        )
+        _log_pip_output(label, result.stdout)
+        return result.returncode, (result.stdout or '')[-PIP_OUTPUT_TAIL_CHARS:]
+
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    pending: List[str] = []
+    pending_chars = 0
+    tail = ''
+
+    async def _pump() -> None:
+        nonlocal pending_chars, tail
+        while True:
+            chunk = await process.stdout.read(STREAM_READ_CHUNK_SIZE)
+            text = decoder.decode(chunk, final=not chunk)
+            if text:
+                pending.append(text)
+                pending_chars += len(text)
+                tail = (tail + text)[-PIP_OUTPUT_TAIL_CHARS:]
+            if pending and (not chunk or pending_chars >= PIP_LOG_FLUSH_CHARS):
+                _log_pip_output(label, ''.join(pending))
+                pending.clear()
+                pending_chars = 0
+            if not chunk:
+                return
+
+    try:
+        await asyncio.wait_for(asyncio.gather(_pump(), process.wait()), timeout=timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        if pending:
+            _log_pip_output(label, ''.join(pending))
+        raise
+    return process.returncode, tail
+
+
+async def _detect_nvcc_async() -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """Detect nvcc version by probing common locations (cached after the first success)."""
+    global _nvcc_detection
+    if _nvcc_detection is not None:
+        return _nvcc_detection
+
+    for candidate in _NVCC_CANDIDATES:
         path_obj = Path(candidate)
         if candidate != 'nvcc' and not path_obj.exists():
             continue
 
         try:
-            result = subprocess.run(
-                [candidate, '--version'],
-                capture_output=True,
-                text=True,
-                timeout=10,
-            )
+            returncode, stdout, stderr = await _run_tool([candidate, '--version'], timeout=10)
         except FileNotFoundError:
             continue
         except Exception:
             continue
 
-        if result.returncode != 0:
+        if returncode != 0:
             continue
 
-        output = result.stdout or result.stderr or ''
+        output = stdout or stderr or ''
         match = re.search(r'release\s+(\d+\.\d+)', output)
         if match:
-            return match.group(1), candidate, output.strip()
+            _nvcc_detection = (match.group(1), candidate, output.strip())
+            return _nvcc_detection
 
     return None, None, None
 
-def get_python_cmd() -> List[str]:
+
+@functools.lru_cache(maxsize=1)
+def get_python_cmd() -> Tuple[str, ...]:
     """
     Get the proper Python command for running scripts
     
@@ -165,33 +341,53 @@ def get_python_cmd() -> List[str]:
     The -s flag is only needed for pip operations (handled in config.py)
     
     Returns:
-        List of command parts for running Python
+        Tuple of command parts for running Python (cached; unpack into a new list)
     """
-    return [sys.executable]
+    return (sys.executable,)
+
+
+@functools.lru_cache(maxsize=1)
+def _script_runner_class():
+    """Import web/script_runner.ScriptRunner once (failures are not cached, so they retry)."""
+    if WEB_DIR not in sys.path:
+        sys.path.insert(0, WEB_DIR)
+    from script_runner import ScriptRunner
+    return ScriptRunner
+
 
-def debug_log(message):
+_DEBUG_NOISY_KEYS = (
+    "token", "request data", "options", "script path", "script directory",
+    "detected comfyui root", "working directory", "env", "payload", "args:",
+    "loaded node mappings", "parsed data", "skipping local script validation",
+    "starting workflow_downloader", "status/update"
+)
+_DEBUG_ALLOW_KEYS = (
+    "install", "installation", "custom node", "models", "summary", "download",
+    "✓", "✗", "error", "failed"
+)
+_DEBUG_NOISY_RE = re.compile('|'.join(map(re.escape, _DEBUG_NOISY_KEYS)), re.IGNORECASE)
+_DEBUG_ALLOW_RE = re.compile('|'.join(map(re.escape, _DEBUG_ALLOW_KEYS)), re.IGNORECASE)
+
+
+def debug_log(message, *args):
     """
     Debug logging with basic redaction:
     - Suppress console printing for sensitive/noisy details (tokens, paths, full payloads)
     - Still log everything to debug, but only surface user-relevant messages to stdout
+    - Optional %-style args are only formatted when the message can actually be emitted
     """
     try:
-        msg_str = str(message)
-        lowered = msg_str.lower()
-        noisy_keys = [
-            "token", "request data", "options", "script path", "script directory",
-            "detected comfyui root", "working directory", "env", "payload", "args:",
-            "loaded node mappings", "parsed data", "skipping local script validation",
-            "starting workflow_downloader", "status/update"
-        ]
-        allow_keys = [
-            "install", "installation", "custom node", "models", "summary", "download",
-            "✓", "✗", "error", "failed"
-        ]
-        is_noisy = any(k in lowered for k in noisy_keys)
-        is_allowed = any(k in lowered for k in allow_keys)
-        logger.debug(f"Nitra: {msg_str}")
-        if is_allowed and not is_noisy:
+        if args:
+            if not logger.isEnabledFor(logging.DEBUG) and _DEBUG_NOISY_RE.search(message):
+                # A noisy template is never printed, so skip formatting entirely
+                return
+            msg_str = message % args
+        else:
+            msg_str = str(message)
+        is_allowed = _DEBUG_ALLOW_RE.search(msg_str) is not None
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Nitra: {msg_str}")
+        if is_allowed and not _DEBUG_NOISY_RE.search(msg_str):
             print(f"Nitra: {msg_str}", flush=True)
     except Exception:
         # If logging fails, fail silently
@@ -207,273 +403,730 @@ def _mask_token_preview(token: Optional[str]) -> str:
     return f"{token[:4]}...{token[-4:]}"
 
 
-def handle_stream(stream, prefix):
-    """Handle subprocess output streaming to terminal (from ComfyUI-Manager)"""
-    import sys
-    stream.reconfigure(encoding='utf-8', errors='replace')
-    
-    # Read character by character to handle progress bars that use \r without \n
+# Each pump read drains everything the pipe transport has buffered (up to 64 KiB), so a
+# burst of progress-bar refreshes is decoded and split in one pass instead of 4 KiB slices
+STREAM_READ_CHUNK_SIZE = 64 * 1024
+_STREAM_LINE_SPLIT_RE = re.compile(r'([\r\n])')
+# A progress line has a rate/progress marker AND a bar/size unit, in any order
+_PROGRESS_MARKER_RE = re.compile(r'it/s\]|s/it\]|Downloading|%')
+_PROGRESS_UNIT_RE = re.compile(r'%\||it \[|MB|GB')
+
+
+def _emit_stream_line(msg: str, prefix: str) -> None:
+    """Print one terminated line of subprocess output to the terminal (flushed by the caller)."""
+    # Handle progress bars and download progress
+    if _PROGRESS_MARKER_RE.search(msg) and _PROGRESS_UNIT_RE.search(msg):
+        # Print with carriage return to allow overwriting
+        print('\r' + msg.rstrip(), end="", file=sys.stderr)
+    # Handle regular output
+    else:
+        if prefix == '[!]':
+            print(prefix, msg, end="", file=sys.stderr)
+        else:
+            print(prefix, msg, end="")
+
+
+def _flush_stream_output() -> None:
+    sys.stdout.flush()
+    sys.stderr.flush()
+
+
+async def _pump_stream(stream: asyncio.StreamReader, prefix: str) -> None:
+    """Stream subprocess output to the terminal (adapted from ComfyUI-Manager's handle_stream)"""
+    # Split on \r / \n ourselves so progress bars that use \r without \n still overwrite in place
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
     buffer = ""
     while True:
-        char = stream.read(1)
-        if not char:
+        chunk = await stream.read(STREAM_READ_CHUNK_SIZE)
+        if not chunk:
             break
-            
-        buffer += char
-        
-        # On carriage return or newline, process the line
-        if char in ['\r', '\n']:
-            if buffer.strip():
-                msg = buffer
-                # Handle progress bars and download progress
-                if ('it/s]' in msg or 's/it]' in msg or 'Downloading' in msg or '%' in msg) and ('%|' in msg or 'it [' in msg or 'MB' in msg or 'GB' in msg):
-                    # Print with carriage return to allow overwriting
-                    print('\r' + msg.rstrip(), end="", file=sys.stderr)
-                    sys.stderr.flush()
-                # Handle regular output
-                else:
-                    if prefix == '[!]':
-                        print(prefix, msg, end="", file=sys.stderr)
-                        sys.stderr.flush()
-                    else:
-                        print(prefix, msg, end="")
-                        sys.stdout.flush()
-            
-            # Clear buffer on newline, keep on carriage return
-            if char == '\n':
-                buffer = ""
-            elif char == '\r':
-                buffer = ""
+
+        # Split keeps separators: [text, sep, text, sep, ..., partial]
+        parts = _STREAM_LINE_SPLIT_RE.split(buffer + decoder.decode(chunk))
+        buffer = parts.pop()
+        for i in range(0, len(parts), 2):
+            msg = parts[i] + parts[i + 1]
+            if msg.strip():
+                _emit_stream_line(msg, prefix)
+        # One flush per chunk rather than per line: a burst of progress refreshes
+        # reaches the terminal in a single write
+        _flush_stream_output()
+
+    buffer += decoder.decode(b'', final=True)
+    if buffer.strip():
+        _emit_stream_line(buffer + '\n', prefix)
+        _flush_stream_output()
 
 # Register routes directly on PromptServer.instance - EXACT ComfyUI-Manager pattern
 routes = PromptServer.instance.routes
 
+
+def _json_response(data: Any, status: int = 200) -> web.Response:
+    """web.json_response, but encoded with orjson (straight to bytes) when it is installed."""
+    if orjson is None:
+        return web.json_response(data, status=status)
+    return web.Response(
+        body=orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS),
+        status=status,
+        content_type='application/json',
+    )
+
+
+_UNAUTHORIZED_BODY = json.dumps({"error": "Missing or invalid authorization header"}).encode()
+_MISSING_TOKEN_BODY = json.dumps({"error": "Missing access token"}).encode()
+
+
+def require_bearer(handler=None, *, allow_empty: bool = False):
+    """Route decorator enforcing 'Authorization: Bearer <token>'.
+
+    Answers 401 itself when the header is missing/malformed (or the token is empty, unless
+    allow_empty) and otherwise stores the token in request['access_token'].
+    """
+    if handler is None:
+        return functools.partial(require_bearer, allow_empty=allow_empty)
+
+    @functools.wraps(handler)
+    async def wrapper(request):
+        access_token = _extract_bearer(request)
+        if access_token is None:
+            return web.Response(body=_UNAUTHORIZED_BODY, status=401, content_type='application/json')
+        if not access_token and not allow_empty:
+            return web.Response(body=_MISSING_TOKEN_BODY, status=401, content_type='application/json')
+        request['access_token'] = access_token
+        return await handler(request)
+
+    return wrapper
+
+
+# Shared outbound HTTP client. Prefer the session ComfyUI's PromptServer already owns;
+# otherwise lazily create one and close it when the aiohttp app shuts down
+_http_session: Optional[aiohttp.ClientSession] = None
+UPSTREAM_MAX_CONNECTIONS = 100
+UPSTREAM_MAX_KEEPALIVE = 20
+UPSTREAM_KEEPALIVE_SECONDS = 60.0
+
+
+async def _close_http_session(app) -> None:
+    """aiohttp on_cleanup hook closing the session created by _get_http_session."""
+    global _http_session
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
+    _http_session = None
+
+
+def _register_http_session_cleanup() -> None:
+    """Close our fallback client session together with PromptServer's aiohttp app."""
+    try:
+        PromptServer.instance.app.on_cleanup.append(_close_http_session)
+    except Exception:
+        pass
+
+
+async def _get_http_session() -> aiohttp.ClientSession:
+    """Return a pooled aiohttp client session for outbound requests."""
+    global _http_session
+    shared = getattr(PromptServer.instance, 'client_session', None)
+    if isinstance(shared, aiohttp.ClientSession) and not shared.closed:
+        return shared
+    if _http_session is None or _http_session.closed:
+        # Keep sockets to the website warm between polls (handshake dominates these small
+        # JSON fetches) and cache its DNS answer; cap concurrency like a browser would
+        connector = aiohttp.TCPConnector(
+            limit=UPSTREAM_MAX_CONNECTIONS,
+            limit_per_host=UPSTREAM_MAX_KEEPALIVE,
+            keepalive_timeout=UPSTREAM_KEEPALIVE_SECONDS,
+            ttl_dns_cache=300,
+        )
+        _http_session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=30),
+        )
+    return _http_session
+
+
+_register_http_session_cleanup()
+
 # Config endpoint - provides frontend with server configuration
 @routes.get('/nitra/config')
 async def get_config(request):
     """Return configuration for frontend - single source of truth"""
-    return web.json_response({
+    return _json_response({
         'websiteBaseUrl': WEBSITE_BASE_URL
     })
 
-@routes.get('/nitra/check-versions')
-async def check_versions(request):
-    """Check installed versions of Visual Studio Build Tools, Python, and Windows-Triton"""
-    try:
-        import platform
-        os_type = platform.system()
-        logger.info(f"Nitra: OS detection - platform.system() returned: {os_type}")
-        
-        versions = {
-            'os': os_type,
-            'vs_build_tools': {'installed': False, 'version': None},
-            'python': {'version': None},
-            'torch': {'installed': False, 'version': None},
-            'cudaDriver': {'version': None, 'path': None, 'raw': None},
-            'triton': {'installed': False, 'version': None},
-            'windows_triton': {'installed': False, 'version': None, 'latest_version': None},
-            'sageattention': {'installed': False, 'version': None, 'latest_version': None},
-            'onnx': {'installed': False, 'version': None, 'latest_version': None},
-            'onnxruntime': {'installed': False, 'version': None},
-            'onnxruntime_gpu': {'installed': False, 'version': None, 'latest_version': None}
-        }
-        
-        logger.info(f"Nitra: Versions response will include OS: {os_type}")
-        
-        # Check Python version
-        try:
-            import platform
-            versions['python']['version'] = platform.python_version()
-        except Exception as e:
-            logger.warning(f"Failed to get Python version: {e}")
-        
-        # Check Visual Studio Build Tools (Windows only)
-        try:
-            import platform
-            if platform.system() == 'Windows':
-                # Check if Visual Studio Build Tools are installed
-                result = subprocess.run(
-                    ['winget', 'list', '--id', 'Microsoft.VisualStudio.2022.BuildTools'],
-                    capture_output=True,
-                    text=True,
-                    timeout=10
-                )
-                if result.returncode == 0 and 'BuildTools' in result.stdout:
-                    versions['vs_build_tools']['installed'] = True
-        except Exception as e:
-            logger.warning(f"Failed to check VS Build Tools: {e}")
-        
-        # Check PyTorch version (fast - direct import)
+# check-versions results rarely change within a session, but the frontend polls them
+VERSIONS_CACHE_TTL_SECONDS = 30.0
+_versions_cache: Tuple[float, Optional[Dict[str, Any]]] = (0.0, None)
+_versions_cache_lock = asyncio.Lock()
+
+
+# Installed-programs (ARP) registry keys - the same entries `winget list` reads
+_UNINSTALL_REGISTRY_KEYS = (
+    r'SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall',
+    r'SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall',
+)
+_vs_build_tools_found = False
+
+
+def _registry_has_vs_build_tools() -> bool:
+    """Look for Visual Studio Build Tools 2022 among installed programs in the registry."""
+    for key_path in _UNINSTALL_REGISTRY_KEYS:
         try:
-            import torch
-            versions['torch']['installed'] = True
-            versions['torch']['version'] = torch.__version__
-            # Get CUDA version from torch
-            if torch.cuda.is_available():
-                versions['cuda'] = {'version': torch.version.cuda}
-            else:
-                versions['cuda'] = {'version': None}
-        except ImportError:
-            versions['cuda'] = {'version': None}
-        except Exception as e:
-            logger.warning(f"Failed to check PyTorch: {e}")
-            versions['cuda'] = {'version': None}
+            uninstall_key = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, key_path)
+        except FileNotFoundError:
+            continue
+        with uninstall_key:
+            for index in range(winreg.QueryInfoKey(uninstall_key)[0]):
+                try:
+                    with winreg.OpenKey(uninstall_key, winreg.EnumKey(uninstall_key, index)) as entry:
+                        display_name = str(winreg.QueryValueEx(entry, 'DisplayName')[0])
+                except OSError:
+                    continue
+                if 'Build Tools' in display_name and '2022' in display_name:
+                    return True
+    return False
+
+
+async def _winget_has_vs_build_tools() -> bool:
+    """Ask winget whether Visual Studio Build Tools 2022 is installed (spawns AppInstaller)."""
+    returncode, stdout, _ = await _run_tool(
+        ['winget', 'list', '--id', 'Microsoft.VisualStudio.2022.BuildTools'],
+        timeout=10
+    )
+    return returncode == 0 and 'BuildTools' in stdout
+
+
+async def _probe_vs_build_tools() -> Dict[str, Any]:
+    """Check Visual Studio Build Tools (Windows only)"""
+    global _vs_build_tools_found
+    vs_build_tools = {'installed': False, 'version': None}
+    try:
+        if _IS_WINDOWS:
+            # Once found, stays found for the life of the server
+            if not _vs_build_tools_found:
+                try:
+                    _vs_build_tools_found = _registry_has_vs_build_tools()
+                except Exception as registry_error:
+                    # Registry unavailable - fall back to the (slow) winget query
+                    logger.debug(f"Nitra: Registry check for VS Build Tools failed: {registry_error}")
+                    _vs_build_tools_found = await _winget_has_vs_build_tools()
+            vs_build_tools['installed'] = _vs_build_tools_found
+    except Exception as e:
+        logger.warning(f"Failed to check VS Build Tools: {e}")
+    return {'vs_build_tools': vs_build_tools}
+
 
-        nvcc_version, nvcc_path, nvcc_output = detect_nvcc_driver_version()
-        versions['cudaDriver'] = {
+def _probe_torch() -> Dict[str, Any]:
+    """Check PyTorch and the CUDA version it was built against"""
+    torch_info = {'installed': False, 'version': None}
+    try:
+        import torch
+        torch_info['installed'] = True
+        torch_info['version'] = torch.__version__
+        # Get CUDA version from torch
+        if torch.cuda.is_available():
+            cuda = {'version': torch.version.cuda}
+        else:
+            cuda = {'version': None}
+    except ImportError:
+        cuda = {'version': None}
+    except Exception as e:
+        logger.warning(f"Failed to check PyTorch: {e}")
+        cuda = {'version': None}
+    return {'torch': torch_info, 'cuda': cuda}
+
+
+async def _probe_cuda_driver() -> Dict[str, Any]:
+    """Check the nvcc toolchain version"""
+    nvcc_version, nvcc_path, nvcc_output = await _detect_nvcc_async()
+    return {
+        'cudaDriver': {
             'version': nvcc_version,
             'path': nvcc_path,
             'raw': nvcc_output,
         }
+    }
+
+
+def _probe_triton() -> Dict[str, Any]:
+    """Check regular Triton (for Linux/Mac)"""
+    triton_info = {'installed': False, 'version': None}
+    try:
+        triton_info['version'] = package_version('triton')
+        triton_info['installed'] = True
+    except PackageNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Failed to check Triton: {e}")
+    return {'triton': triton_info}
+
+
+def _probe_windows_triton() -> Dict[str, Any]:
+    """Check Windows-Triton (dist-info metadata keeps the full version including post-release)"""
+    windows_triton = {'installed': False, 'version': None, 'latest_version': None}
+    try:
+        # On Windows, ONLY check for 'triton-windows' package (not 'triton')
+        # On Linux/Mac, check for 'triton' package
+        if _IS_WINDOWS:
+            # Windows: Only check for 'triton-windows'
+            package_name = 'triton-windows'
+        else:
+            # Linux/Mac: Check for 'triton'
+            package_name = 'triton'
         
-        # Check regular Triton (for Linux/Mac)
-        try:
-            result = subprocess.run(
-                [sys.executable, '-m', 'pip', 'show', 'triton'],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            if result.returncode == 0:
-                versions['triton']['installed'] = True
-                # Parse version from pip show output
-                for line in result.stdout.split('\n'):
-                    if line.startswith('Version:'):
-                        versions['triton']['version'] = line.split(':', 1)[1].strip()
-                        break
-        except Exception as e:
-            logger.warning(f"Failed to check Triton: {e}")
-        
-        # Check Windows-Triton installation (use pip show for full version including post-release)
-        try:
-            # On Windows, ONLY check for 'triton-windows' package (not 'triton')
-            # On Linux/Mac, check for 'triton' package
-            import platform
-            is_windows = platform.system().lower() == 'windows'
-            
-            if is_windows:
-                # Windows: Only check for 'triton-windows'
-                package_name = 'triton-windows'
-            else:
-                # Linux/Mac: Check for 'triton'
-                package_name = 'triton'
-            
-            triton_version = None
-            
-            result = subprocess.run(
-                [sys.executable, '-m', 'pip', 'show', package_name],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if result.returncode == 0:
-                for line in result.stdout.split('\n'):
-                    if line.startswith('Version:'):
-                        triton_version = line.split(':', 1)[1].strip()
-                        logger.info(f"Triton version retrieved from pip ({package_name}): {triton_version}")
-                        break
-            
-            if triton_version:
-                versions['windows_triton']['installed'] = True
-                versions['windows_triton']['version'] = triton_version
-            elif not is_windows:
-                # Fallback to direct import only on non-Windows systems
-                import importlib.util
-                spec = importlib.util.find_spec('triton')
-                if spec is not None:
-                    import triton
-                    triton_version = getattr(triton, '__version__', 'unknown')
-                    logger.info(f"Triton version retrieved from module: {triton_version}")
-                    versions['windows_triton']['installed'] = True
-                    versions['windows_triton']['version'] = triton_version
-        except Exception as e:
-            logger.warning(f"Failed to check Windows-Triton: {e}")
-        
-        # Check Sageattention installation (use pip show for custom version format)
-        try:
-            result = subprocess.run(
-                [sys.executable, '-m', 'pip', 'show', 'sageattention'],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if result.returncode == 0:
-                versions['sageattention']['installed'] = True
-                # Parse version from pip show output (handles custom format like 2.2.0+cu128torch2.8.0.post3)
-                for line in result.stdout.split('\n'):
-                    if line.startswith('Version:'):
-                        versions['sageattention']['version'] = line.split(':', 1)[1].strip()
-                        break
-        except Exception as e:
-            logger.warning(f"Failed to check Sageattention: {e}")
-        
-        # Check onnx installation (fast - direct import)
-        try:
-            import importlib.util
-            spec = importlib.util.find_spec('onnx')
-            if spec is not None:
-                import onnx
-                versions['onnx']['installed'] = True
-                versions['onnx']['version'] = getattr(onnx, '__version__', 'unknown')
-        except Exception as e:
-            logger.warning(f"Failed to check onnx: {e}")
+        triton_version = None
         
-        # Check onnxruntime installation (CPU version - should NOT be installed if GPU is)
         try:
-            import importlib.util
-            spec = importlib.util.find_spec('onnxruntime')
-            if spec is not None:
-                import onnxruntime as ort
-                # Check if it's the CPU-only version (no CUDA providers)
-                providers = ort.get_available_providers()
-                if 'CUDAExecutionProvider' not in providers and 'TensorrtExecutionProvider' not in providers:
-                    versions['onnxruntime']['installed'] = True
-                    versions['onnxruntime']['version'] = getattr(ort, '__version__', 'unknown')
-        except Exception as e:
-            logger.warning(f"Failed to check onnxruntime: {e}")
+            triton_version = package_version(package_name)
+            logger.info(f"Triton version retrieved from metadata ({package_name}): {triton_version}")
+        except PackageNotFoundError:
+            pass
         
-        # Check onnxruntime-gpu installation (GPU version - check for CUDA providers)
-        try:
-            import importlib.util
-            spec = importlib.util.find_spec('onnxruntime')
+        if triton_version:
+            windows_triton['installed'] = True
+            windows_triton['version'] = triton_version
+        elif not _IS_WINDOWS:
+            # Fallback to direct import only on non-Windows systems
+            spec = importlib.util.find_spec('triton')
             if spec is not None:
-                import onnxruntime as ort
-                # Check if it's the GPU version by looking for CUDA execution provider
-                providers = ort.get_available_providers()
-                if 'CUDAExecutionProvider' in providers or 'TensorrtExecutionProvider' in providers:
-                    versions['onnxruntime_gpu']['installed'] = True
-                    versions['onnxruntime_gpu']['version'] = getattr(ort, '__version__', 'unknown')
-        except Exception as e:
-            logger.warning(f"Failed to check onnxruntime-gpu: {e}")
-        
-        return web.json_response(versions)
+                import triton
+                triton_version = getattr(triton, '__version__', 'unknown')
+                logger.info(f"Triton version retrieved from module: {triton_version}")
+                windows_triton['installed'] = True
+                windows_triton['version'] = triton_version
+    except Exception as e:
+        logger.warning(f"Failed to check Windows-Triton: {e}")
+    return {'windows_triton': windows_triton}
+
+
+def _probe_sageattention() -> Dict[str, Any]:
+    """Check Sageattention (metadata keeps custom format like 2.2.0+cu128torch2.8.0.post3)"""
+    sageattention = {'installed': False, 'version': None, 'latest_version': None}
+    try:
+        sageattention['version'] = package_version('sageattention')
+        sageattention['installed'] = True
+    except PackageNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Failed to check Sageattention: {e}")
+    return {'sageattention': sageattention}
+
+
+_onnxruntime_providers: Optional[Tuple[str, ...]] = None
+
+
+def _probe_onnx_packages() -> Dict[str, Any]:
+    """Fill the onnx, onnxruntime (CPU) and onnxruntime-gpu slots in one pass"""
+    global _onnxruntime_providers
+    onnx_info = {'installed': False, 'version': None, 'latest_version': None}
+    onnxruntime_cpu = {'installed': False, 'version': None}
+    onnxruntime_gpu = {'installed': False, 'version': None, 'latest_version': None}
+
+    # onnx: dist-info metadata is enough, no need to import the package
+    try:
+        onnx_info['version'] = package_version('onnx')
+        onnx_info['installed'] = True
+    except PackageNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Failed to check onnx: {e}")
+
+    # onnxruntime: CPU vs GPU build is decided by the execution providers it exposes,
+    # which needs one import; the providers tuple is cached for later requests
+    try:
+        if importlib.util.find_spec('onnxruntime') is not None:
+            import onnxruntime as ort
+            if _onnxruntime_providers is None:
+                _onnxruntime_providers = tuple(ort.get_available_providers())
+            providers = _onnxruntime_providers
+            ort_version = getattr(ort, '__version__', 'unknown')
+            # The CPU-only build should NOT be installed alongside the GPU one
+            if 'CUDAExecutionProvider' in providers or 'TensorrtExecutionProvider' in providers:
+                onnxruntime_gpu['installed'] = True
+                onnxruntime_gpu['version'] = ort_version
+            else:
+                onnxruntime_cpu['installed'] = True
+                onnxruntime_cpu['version'] = ort_version
+    except Exception as e:
+        logger.warning(f"Failed to check onnxruntime: {e}")
+
+    return {'onnx': onnx_info, 'onnxruntime': onnxruntime_cpu, 'onnxruntime_gpu': onnxruntime_gpu}
+
+
+# In-process probes (imports/metadata) run in worker threads; the external-tool probes
+# are coroutines built on asyncio subprocesses
+_VERSION_PROBES = (
+    _probe_torch,
+    _probe_triton,
+    _probe_windows_triton,
+    _probe_sageattention,
+    _probe_onnx_packages,
+)
+
+_ASYNC_VERSION_PROBES = (
+    _probe_vs_build_tools,
+    _probe_cuda_driver,
+)
+
+
+# Response slot -> PyPI project for the "latest_version" fields. sageattention is left out on
+# purpose: the wheels users install are custom builds that PyPI does not carry.
+_LATEST_VERSION_PACKAGES = {
+    'windows_triton': 'triton-windows',
+    'onnx': 'onnx',
+    'onnxruntime_gpu': 'onnxruntime-gpu',
+}
+PYPI_LATEST_VERSION_TTL_SECONDS = 600.0
+_latest_version_cache: Dict[str, Tuple[float, Optional[str]]] = {}
+
+
+async def _fetch_latest_version(package: str) -> Optional[str]:
+    """Return the newest release of a package on PyPI (cached for PYPI_LATEST_VERSION_TTL_SECONDS)."""
+    cached = _latest_version_cache.get(package)
+    if cached and time.monotonic() - cached[0] < PYPI_LATEST_VERSION_TTL_SECONDS:
+        return cached[1]
+
+    latest = None
+    try:
+        session = await _get_http_session()
+        async with session.get(
+            f'https://pypi.org/pypi/{package}/json',
+            timeout=aiohttp.ClientTimeout(total=5)
+        ) as response:
+            if response.status == 200:
+                data = await response.json()
+                latest = (data.get('info') or {}).get('version')
+    except Exception as e:
+        logger.warning(f"Failed to fetch latest version of {package} from PyPI: {e}")
+
+    _latest_version_cache[package] = (time.monotonic(), latest)
+    return latest
+
+
+async def _collect_versions() -> Dict[str, Any]:
+    """Probe the environment for the packages reported by /nitra/check-versions"""
+    os_type = platform.system()
+    logger.info(f"Nitra: OS detection - platform.system() returned: {os_type}")
+    
+    versions = {
+        'os': os_type,
+        'python': {'version': None},
+    }
+    
+    logger.info(f"Nitra: Versions response will include OS: {os_type}")
+    
+    # Check Python version
+    try:
+        versions['python']['version'] = platform.python_version()
+    except Exception as e:
+        logger.warning(f"Failed to get Python version: {e}")
+    
+    # Import probes block, so they run in threads; tool probes and the (cached) PyPI
+    # lookups are awaited directly, all concurrently
+    results, latest_versions = await asyncio.gather(
+        asyncio.gather(
+            *(probe() for probe in _ASYNC_VERSION_PROBES),
+            *(asyncio.to_thread(probe) for probe in _VERSION_PROBES),
+        ),
+        asyncio.gather(*(_fetch_latest_version(package) for package in _LATEST_VERSION_PACKAGES.values())),
+    )
+    for result in results:
+        versions.update(result)
+    for key, latest_version in zip(_LATEST_VERSION_PACKAGES, latest_versions):
+        versions[key]['latest_version'] = latest_version
+    return versions
+
+
+@routes.get('/nitra/check-versions')
+async def check_versions(request):
+    """Check installed versions of Visual Studio Build Tools, Python, and Windows-Triton"""
+    global _versions_cache
+    refresh = request.query.get('refresh') == '1'
+    try:
+        async with _versions_cache_lock:
+            cached_at, cached_versions = _versions_cache
+            if not refresh and cached_versions is not None and time.monotonic() - cached_at < VERSIONS_CACHE_TTL_SECONDS:
+                return _json_response(cached_versions)
+
+            versions = await _collect_versions()
+            _versions_cache = (time.monotonic(), versions)
+        return _json_response(versions)
         
     except Exception as e:
         logger.error(f"Error checking versions: {e}")
-        return web.json_response({'error': str(e)}, status=500)
+        return _json_response({'error': str(e)}, status=500)
+
+class _UpdateStatusMap(collections.abc.MutableMapping):
+    """Thread-safe user -> update status map with expiry.
+
+    Entries live for `ttl` seconds, finished ones (completed/failed/cancelled) only for
+    `finished_ttl` once the UI has had a chance to poll them, and the oldest are evicted
+    beyond `maxsize`. Expired entries are dropped lazily on access.
+    """
+
+    _FINISHED_STATUSES = frozenset({'completed', 'failed', 'cancelled'})
+
+    def __init__(self, maxsize: int, ttl: float, finished_ttl: float):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._finished_ttl = finished_ttl
+        self._entries: "collections.OrderedDict[str, Tuple[float, Dict[str, Any]]]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def _is_expired(self, entry: Tuple[float, Dict[str, Any]], now: float) -> bool:
+        stamp, value = entry
+        finished = isinstance(value, dict) and value.get('status') in self._FINISHED_STATUSES
+        return now - stamp >= (self._finished_ttl if finished else self._ttl)
+
+    def _purge(self, now: float) -> None:
+        for key in [key for key, entry in self._entries.items() if self._is_expired(entry, now)]:
+            del self._entries[key]
+
+    def __getitem__(self, key):
+        with self._lock:
+            entry = self._entries[key]
+            if self._is_expired(entry, time.monotonic()):
+                del self._entries[key]
+                raise KeyError(key)
+            return entry[1]
+
+    def __setitem__(self, key, value) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic(), value)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+    def __delitem__(self, key) -> None:
+        with self._lock:
+            del self._entries[key]
+
+    def __iter__(self):
+        with self._lock:
+            self._purge(time.monotonic())
+            return iter(list(self._entries))
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._purge(time.monotonic())
+            return len(self._entries)
+
 
 # Global storage for active updates
-nitra_active_updates = {}
+nitra_active_updates = _UpdateStatusMap(maxsize=10_000, ttl=24 * 3600, finished_ttl=60)
 
 # Global task queue system (ComfyUI-Manager pattern)
-import queue
-task_queue = queue.Queue()
-tasks_in_progress = set()
+# An asyncio.Queue on the task loop is drained by one consumer coroutine that awaits each
+# executor in turn, so installs stay serialized without a dedicated worker thread
+class _TaskQueue(asyncio.Queue):
+    """asyncio.Queue that can drop everything pending and merge duplicate tasks."""
+
+    def clear(self) -> int:
+        """Discard all queued items and return how many were dropped (task loop only)."""
+        # Public get_nowait()/task_done() only, so join() bookkeeping stays with asyncio
+        cleared = 0
+        while True:
+            try:
+                self.get_nowait()
+            except asyncio.QueueEmpty:
+                return cleared
+            self.task_done()
+            cleared += 1
+
+    def put_coalesced(self, item: Tuple[str, Dict[str, Any]], merge) -> bool:
+        """Fold item into a still-queued task with the same type and id, else enqueue it (task loop only).
+
+        merge(queued_data, new_data) updates the queued task in place. Returns True if merged.
+        """
+        task_type, task_data = item
+        for queued_type, queued_data in self._queue:
+            if queued_type == task_type and queued_data['id'] == task_data['id']:
+                merge(queued_data, task_data)
+                return True
+        self.put_nowait(item)
+        return False
+
+
+_task_queue: Optional[_TaskQueue] = None
+_task_consumer: Optional[asyncio.Task] = None
+tasks_in_progress = set()  # only mutated on the task loop
+# Guards every write to running_processes (handlers, the task loop and script workers all
+# mutate it); plain len() reads such as queue_status stay lock-free
 task_worker_lock = threading.Lock()
-task_worker_thread = None
 
 # Track running processes for cancellation
 running_processes = {}  # task_id -> process_info
 
+# Shared workers for execute_script's blocking ScriptRunner runs (bounded, reused threads)
+# (no threads start until the first submit; its atexit shutdown is registered with the other
+# shutdown hooks in _register_shutdown_handlers)
+_SCRIPT_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix='nitra-script')
+
 WINDOWS_CREATE_NEW_PROCESS_GROUP = getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0) if os.name == 'nt' else 0
 _previous_signal_handlers: Dict[int, Any] = {}
 _shutdown_handlers_registered = False
 _aiohttp_shutdown_registered = False
 
+# Tracked child processes live on one background event loop; its stream pumps
+# replace the per-process stdout/stderr reader threads
+_task_loop: Optional[asyncio.AbstractEventLoop] = None
+_task_loop_lock = threading.Lock()
+
+
+def _new_task_event_loop() -> asyncio.AbstractEventLoop:
+    """Build the task loop explicitly rather than from the (possibly overridden) global policy."""
+    if _IS_WINDOWS:
+        # IOCP-backed; the selector loop cannot spawn subprocesses on Windows
+        return asyncio.ProactorEventLoop()
+    # epoll/kqueue: one thread multiplexes the pipes of every tracked subprocess
+    return asyncio.SelectorEventLoop(selectors.DefaultSelector())
+
+
+def _get_task_loop() -> asyncio.AbstractEventLoop:
+    """Return the background event loop that owns tracked subprocesses, starting it on first use."""
+    global _task_loop, _task_queue
+    # Lock-free once started: _task_loop is only ever assigned after the consumer exists
+    loop = _task_loop
+    if loop is not None:
+        return loop
+    with _task_loop_lock:
+        if _task_loop is None:
+            loop = _new_task_event_loop()
+            threading.Thread(target=loop.run_forever, name='nitra-task-loop', daemon=True).start()
+            _task_queue = asyncio.run_coroutine_threadsafe(_start_task_consumer(), loop).result()
+            _task_loop = loop
+        return _task_loop
+
+
+def _run_on_task_loop(coro, timeout: Optional[float] = None):
+    """Run a coroutine on the task loop from another thread and wait for its result."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_task_loop()).result(timeout)
+
+
+async def _start_tracked_process(cmd: List[str], env: Dict[str, str], cwd: str):
+    """Spawn a subprocess whose stdout/stderr are pumped to the terminal by coroutines."""
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        env=env,
+        cwd=cwd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        limit=STREAM_READ_CHUNK_SIZE,
+        # Own process group on both platforms so terminal signals reach only ComfyUI, which
+        # then cleans children up itself (signalling the whole group, see
+        # _terminate_async_process). Without preexec_fn, CPython spawns via vfork/
+        # posix_spawn instead of copying the (PyTorch-sized) parent address space
+        start_new_session=not _IS_WINDOWS,
+        creationflags=WINDOWS_CREATE_NEW_PROCESS_GROUP
+    )
+    stream_pumps = asyncio.gather(
+        _pump_stream(process.stdout, ""),
+        _pump_stream(process.stderr, "[!]"),
+    )
+    return process, stream_pumps
+
+
+async def _wait_tracked_process(process: asyncio.subprocess.Process, stream_pumps: asyncio.Future) -> int:
+    """Wait for a tracked subprocess to exit and its output to be fully drained."""
+    # No thread is parked here: exit status arrives as a loop callback (pidfd readiness on
+    # Linux with Python 3.12+, the policy's child watcher otherwise), so the single task
+    # loop reaps every child the queue has started
+    return_code = await process.wait()
+    await stream_pumps
+    return return_code
+
+
+async def _run_tracked_subprocess(task_id: str, cmd: List[str], env: Dict[str, str], cwd: str,
+                                   kind: str, script_runner=None) -> int:
+    """Run a task subprocess registered in running_processes so it can be cancelled; returns its exit code."""
+    process, stream_pumps = await _start_tracked_process(cmd, env, cwd)
+
+    # Track the process for cancellation
+    process_info = {
+        'process': process,
+        'stream_pumps': stream_pumps,
+        'type': kind,
+    }
+    if script_runner is not None:
+        process_info['script_runner'] = script_runner  # Keep reference for cleanup
+    with task_worker_lock:
+        running_processes[task_id] = process_info
+
+    # Wait for completion and for the output pumps to drain
+    return_code = await _wait_tracked_process(process, stream_pumps)
+
+    # Clean up script runner (deletes its temp directory and downloaded scripts)
+    if script_runner is not None:
+        try:
+            await asyncio.to_thread(script_runner.cleanup)
+        except Exception as cleanup_error:
+            debug_log(f"Error cleaning up script runner for task {task_id}: {cleanup_error}")
+
+    # Remove from running processes
+    with task_worker_lock:
+        running_processes.pop(task_id, None)
+    return return_code
+
+
+def _is_process_running(proc) -> bool:
+    """Return True while a tracked Popen or asyncio subprocess has not exited."""
+    if proc is None:
+        return False
+    if isinstance(proc, subprocess.Popen):
+        return proc.poll() is None
+    return proc.returncode is None
+
+
+def _signal_process_group(proc: asyncio.subprocess.Process, sig: int) -> None:
+    """Send sig to a tracked child's whole session (POSIX), so pip/downloader grandchildren get it too."""
+    try:
+        # Tracked children are started with start_new_session, so their pid is the group id
+        os.killpg(proc.pid, sig)
+    except ProcessLookupError:
+        pass
+    except OSError:
+        if proc.returncode is None:
+            proc.send_signal(sig)
+
+
+async def _terminate_async_process(proc: asyncio.subprocess.Process) -> None:
+    """Terminate an asyncio subprocess gracefully, then forcefully (runs on the task loop)."""
+    try:
+        if os.name == 'nt':
+            try:
+                proc.send_signal(signal.CTRL_BREAK_EVENT)
+                await asyncio.wait_for(proc.wait(), timeout=5)
+                return
+            except Exception:
+                pass
+            proc.terminate()
+        else:
+            _signal_process_group(proc, signal.SIGTERM)
+        await asyncio.wait_for(proc.wait(), timeout=5)
+    except Exception:
+        try:
+            if os.name == 'nt':
+                proc.kill()
+            else:
+                _signal_process_group(proc, signal.SIGKILL)
+            await asyncio.wait_for(proc.wait(), timeout=1)
+        except Exception:
+            pass
+    if os.name != 'nt':
+        # The leader is gone; do not leave grandchildren that ignored SIGTERM behind
+        _signal_process_group(proc, signal.SIGKILL)
+
 
-def _terminate_child_process(proc: subprocess.Popen, task_id: str) -> None:
+def _terminate_child_process(proc, task_id: str) -> None:
     """Attempt to terminate a tracked subprocess gracefully, then forcefully."""
-    if proc is None or proc.poll() is not None:
+    if not _is_process_running(proc):
+        return
+
+    if not isinstance(proc, subprocess.Popen):
+        try:
+            _run_on_task_loop(_terminate_async_process(proc), timeout=15)
+        except Exception:
+            pass
         return
 
     try:
@@ -494,29 +1147,60 @@ def _terminate_child_process(proc: subprocess.Popen, task_id: str) -> None:
             pass
 
 
-def _join_thread_safely(thread: Optional[threading.Thread]) -> None:
-    """Join a thread with a small timeout to avoid blocking shutdown."""
-    if thread and thread.is_alive():
+async def _terminate_async_processes(procs: List[asyncio.subprocess.Process]) -> None:
+    """Terminate several asyncio subprocesses at once (runs on the task loop)."""
+    await asyncio.gather(*(_terminate_async_process(proc) for proc in procs))
+
+
+def _terminate_child_processes(procs: List[Any], grace_seconds: float = 5.0) -> None:
+    """Terminate many tracked subprocesses with one shared grace period instead of one each."""
+    live = [proc for proc in procs if _is_process_running(proc)]
+    popen_procs = [proc for proc in live if isinstance(proc, subprocess.Popen)]
+    async_procs = [proc for proc in live if not isinstance(proc, subprocess.Popen)]
+
+    # Pass 1: signal every Popen child without waiting on any of them
+    for proc in popen_procs:
+        try:
+            if os.name == 'nt':
+                proc.send_signal(signal.CTRL_BREAK_EVENT)
+            else:
+                proc.terminate()
+        except Exception:
+            pass
+    deadline = time.monotonic() + grace_seconds
+
+    # asyncio children are signalled and awaited concurrently on the task loop meanwhile
+    if async_procs:
         try:
-            thread.join(timeout=1)
+            _run_on_task_loop(_terminate_async_processes(async_procs), timeout=3 * grace_seconds)
         except Exception:
             pass
 
+    # Pass 2: poll against the shared deadline, then kill whatever is left
+    pending = popen_procs
+    while pending and time.monotonic() < deadline:
+        pending = [proc for proc in pending if proc.poll() is None]
+        if pending:
+            time.sleep(0.05)
+    for proc in pending:
+        if proc.poll() is None:
+            try:
+                proc.kill()
+                proc.wait(timeout=1)
+            except Exception:
+                pass
+
 
 def _cleanup_running_processes() -> None:
-    """Terminate all tracked subprocesses and join their streaming threads."""
+    """Drop queued tasks, then terminate all tracked subprocesses and clean up their script runners."""
+    _cancel_pending_tasks()
     with task_worker_lock:
         entries = list(running_processes.items())
         running_processes.clear()
-        tasks_in_progress.clear()
-
-    for task_id, info in entries:
-        proc = info.get('process')
-        _terminate_child_process(proc, task_id)
 
-        _join_thread_safely(info.get('stdout_thread'))
-        _join_thread_safely(info.get('stderr_thread'))
+    _terminate_child_processes([info.get('process') for _, info in entries])
 
+    for _, info in entries:
         script_runner = info.get('script_runner')
         if script_runner:
             try:
@@ -547,7 +1231,11 @@ def _register_promptserver_shutdown() -> None:
         return
 
     if _aiohttp_cleanup_callback not in on_shutdown:
-        on_shutdown.append(_aiohttp_cleanup_callback)
+        try:
+            on_shutdown.append(_aiohttp_cleanup_callback)
+        except RuntimeError:
+            # Signal lists are frozen once the app has started
+            return
         _aiohttp_shutdown_registered = True
 
 
@@ -558,6 +1246,7 @@ def _register_shutdown_handlers() -> None:
         return
 
     atexit.register(_cleanup_running_processes)
+    atexit.register(functools.partial(_SCRIPT_POOL.shutdown, wait=False, cancel_futures=True))
 
     def _handle_signal(signum, frame):
         _cleanup_running_processes()
@@ -579,39 +1268,96 @@ def _register_shutdown_handlers() -> None:
     _shutdown_handlers_registered = True
 
 
-_register_shutdown_handlers()
+# Only the aiohttp hook is registered at import (the app's signal lists freeze once it
+# starts). Signal/atexit handlers are installed lazily, from the request handlers that
+# first launch a subprocess, so a ComfyUI session that never uses Nitra is left alone.
+_register_promptserver_shutdown()
 
-def task_worker():
-    """Worker thread that processes tasks from the queue (ComfyUI-Manager pattern)"""
-    global task_worker_thread
-    
+async def _run_task(task_type: str, task_data: Dict[str, Any]) -> None:
+    """Run one queued task on the task loop (ComfyUI-Manager pattern)"""
+    if task_type == 'workflow':
+        await execute_workflow_task(task_data)
+    elif task_type == 'model':
+        await execute_model_task(task_data)
+
+
+async def _consume_tasks(queue: asyncio.Queue) -> None:
+    """Single consumer draining the task queue, one task at a time."""
     while True:
+        task_type, task_data = await queue.get()
+        task_key = (task_type, task_data['id'])
+        tasks_in_progress.add(task_key)
         try:
-            with task_worker_lock:
-                if task_queue.empty():
-                    task_worker_thread = None
-                    return  # terminate worker thread
-                
-                task_type, task_data = task_queue.get()
-                tasks_in_progress.add((task_type, task_data['id']))
-            
-            # Execute the task
-            if task_type == 'workflow':
-                execute_workflow_task(task_data)
-            elif task_type == 'model':
-                execute_model_task(task_data)
-            
-            # Remove from in-progress
-            with task_worker_lock:
-                tasks_in_progress.discard((task_type, task_data['id']))
-                
+            await _run_task(task_type, task_data)
         except Exception as e:
             debug_log(f"Error in task worker: {e}")
-            with task_worker_lock:
-                if (task_type, task_data['id']) in tasks_in_progress:
-                    tasks_in_progress.discard((task_type, task_data['id']))
+        finally:
+            tasks_in_progress.discard(task_key)
+            queue.task_done()
+
+
+async def _start_task_consumer() -> _TaskQueue:
+    """Create the task queue and its consumer on the task loop."""
+    global _task_consumer
+    queue = _TaskQueue()
+    _task_consumer = asyncio.ensure_future(_consume_tasks(queue))
+    return queue
+
+
+def _merge_install_task(ids_key: str, queued: Dict[str, Any], new: Dict[str, Any]) -> None:
+    """Merge a newer install request into the same user's queued one: union of ids, newest env/token."""
+    ids = list(dict.fromkeys([*queued[ids_key], *new[ids_key]]))
+    hf_token = new.get('hf_token') or queued.get('hf_token', '')
+    queued.update(new)
+    queued[ids_key] = ids
+    queued['hf_token'] = hf_token
+    # Keep the local-scripts argv and the options env var in step with the merged ids
+    cmd = queued['cmd']
+    cmd[cmd.index(_jdumps(new[ids_key]))] = _jdumps(ids)
+    if hf_token and not new.get('hf_token'):
+        cmd.append(hf_token)
+    options = _jloads(queued['env']['NITRA_UPDATE_OPTIONS'])
+    options[ids_key] = ids
+    options['hf_token'] = hf_token
+    queued['env']['NITRA_UPDATE_OPTIONS'] = _jdumps(options)
+    debug_log(f"Merged install request into queued task {queued['id']} ({len(ids)} ids)")
+
+
+def enqueue_task(task_type: str, task_data: Dict[str, Any], coalesce_key: Optional[str] = None) -> None:
+    """Queue a workflow/model task for the task consumer (safe to call from any thread).
+
+    With coalesce_key, a request for a user whose previous task of this type has not started
+    yet is merged into it (union of task_data[coalesce_key]) instead of spawning another run.
+    """
+    _register_shutdown_handlers()
+    loop = _get_task_loop()
+    if coalesce_key is None:
+        loop.call_soon_threadsafe(_task_queue.put_nowait, (task_type, task_data))
+    else:
+        merge = functools.partial(_merge_install_task, coalesce_key)
+        loop.call_soon_threadsafe(_task_queue.put_coalesced, (task_type, task_data), merge)
+
+
+def _queued_task_count() -> int:
+    """Number of queued tasks that have not started yet."""
+    return _task_queue.qsize() if _task_queue is not None else 0
+
 
-def execute_workflow_task(task_data):
+async def _drain_task_queue() -> int:
+    """Remove every queued task (runs on the task loop)."""
+    return _task_queue.clear()
+
+
+def _cancel_pending_tasks() -> int:
+    """Drop tasks that are queued but not yet running; returns how many were dropped."""
+    if _task_loop is None:
+        return 0
+    try:
+        return _run_on_task_loop(_drain_task_queue(), timeout=5)
+    except Exception:
+        return 0
+
+async def execute_workflow_task(task_data):
     """Execute a workflow installation task using script runner system"""
     task_id = task_data['id']
     _register_promptserver_shutdown()
@@ -632,37 +1378,37 @@ def execute_workflow_task(task_data):
         if not USE_LOCAL_SCRIPTS:
             
             try:
-                # Import script runner
-                import sys
-                web_dir = os.path.join(os.path.dirname(__file__), 'web')
-                if web_dir not in sys.path:
-                    sys.path.insert(0, web_dir)
-                
-                from script_runner import ScriptRunner
+                web_dir = WEB_DIR
+                ScriptRunner = _script_runner_class()
                 
                 # Create script runner and execute
                 configs_url = f'{WEBSITE_BASE_URL}/api'
                 runner = ScriptRunner(access_token=access_token, configs_url=configs_url)
                 
                 # Download the script first
-                if runner.download_script('workflow_downloader', local_test=False):
+                # ScriptRunner does blocking network/file I/O, so it runs in a worker thread
+                if await asyncio.to_thread(runner.download_script, 'workflow_downloader', local_test=False):
                     
                     # Also download model_downloads.py since workflow_downloader imports it
                     model_downloads_runner = ScriptRunner(access_token=access_token, configs_url=configs_url)
                     workflow_temp_dir = os.path.dirname(runner.script_path)
                     model_downloads_dest = os.path.join(workflow_temp_dir, 'model_downloads.py')
                     
-                    if model_downloads_runner.download_script('model_downloads', local_test=False):
+                    if await asyncio.to_thread(model_downloads_runner.download_script, 'model_downloads', local_test=False):
                         try:
-                            # Copy model_downloads.py to the same temp directory as workflow_downloader
-                            import shutil
-                            shutil.copy2(model_downloads_runner.script_path, model_downloads_dest)
+                            # Move model_downloads.py into the same temp directory as workflow_downloader.
+                            # Both temp dirs share a filesystem, so this is a rename rather than a copy
+                            try:
+                                os.replace(model_downloads_runner.script_path, model_downloads_dest)
+                            except OSError:
+                                shutil.copy2(model_downloads_runner.script_path, model_downloads_dest)
                             # Verify file exists
                             if not os.path.exists(model_downloads_dest):
                                 raise Exception(f"Failed to copy model_downloads.py to {model_downloads_dest}")
                         finally:
                             # Clean up model_downloads_runner temp directory immediately after copying
-                            model_downloads_runner.cleanup()
+                            # (rmtree, so off the task loop)
+                            await asyncio.to_thread(model_downloads_runner.cleanup)
                     else:
                         raise Exception("Failed to download model_downloads.py")
                     
@@ -673,225 +1419,73 @@ def execute_workflow_task(task_data):
                     # Create a subprocess for the downloaded script that can be tracked/cancelled
                     script_path = runner.script_path
                     
-                    # Set working directory to web directory where setup_modules is located
-                    web_dir = os.path.join(os.path.dirname(__file__), 'web')
-                    
                     # Get the temp directory where scripts are located (model_downloads.py needs to be importable)
                     script_temp_dir = os.path.dirname(script_path)
                     
                     # Update environment with proper Python path
                     # Include both the temp directory (for model_downloads import) and web_dir (for setup_modules)
                     # Put temp directory first so model_downloads can be found
-                    pythonpath_parts = [script_temp_dir, web_dir]
-                    if 'PYTHONPATH' in env:
-                        existing_path = env['PYTHONPATH']
-                        if existing_path and existing_path not in pythonpath_parts:
-                            pythonpath_parts.append(existing_path)
-                    env['PYTHONPATH'] = os.pathsep.join(pythonpath_parts)
-                    
-                    # Build command with explicit sys.path manipulation to ensure setup_modules is found
-                    # Python adds the script's directory to sys.path[0], but we need web_dir there too
-                    # Create a Python wrapper that sets up sys.path before executing the script
-                    import json as json_module
-                    workflow_ids_json = json_module.dumps(workflow_ids)
+                    env['PYTHONPATH'] = (script_temp_dir + os.pathsep + _WEB_DIR_PATHSEP + env.get('PYTHONPATH', '')).rstrip(os.pathsep)
                     
-                    # Escape paths for Python raw strings (r'...')
-                    # For raw strings, we only need to escape backslashes and quotes
-                    def escape_for_raw_string(s):
-                        return s.replace('\\', '\\\\').replace("'", "\\'")
+                    # Run the script through the static web/nitra_wrapper.py entry point, which puts
+                    # web_dir and the temp dir on sys.path and rebuilds sys.argv from these variables
+                    env['NITRA_WEB_DIR'] = web_dir
+                    env['NITRA_SCRIPT_PATH'] = script_path
+                    # IDs travel as a file in the script's temp dir (removed with it by runner.cleanup())
+                    ids_path = os.path.join(script_temp_dir, 'workflow_ids.json')
+                    with open(ids_path, 'w', encoding='utf-8') as ids_file:
+                        json.dump(workflow_ids, ids_file)
+                    env['NITRA_IDS_FILE'] = ids_path
+                    env['NITRA_HF_TOKEN'] = hf_token or ''
                     
-                    web_dir_escaped = escape_for_raw_string(web_dir)
-                    script_temp_dir_escaped = escape_for_raw_string(script_temp_dir)
-                    script_path_escaped = escape_for_raw_string(script_path)
-                    workflow_ids_json_escaped = escape_for_raw_string(workflow_ids_json)
-                    
-                    # Create wrapper code that:
-                    # 1. Adds web_dir and script_temp_dir to sys.path (web_dir first for setup_modules)
-                    # 2. Sets sys.argv with workflow_ids and optional hf_token
-                    # 3. Executes the script with proper __file__ context
-                    wrapper_code = f"""import sys, os, json
-sys.path.insert(0, r'{web_dir_escaped}')
-sys.path.insert(1, r'{script_temp_dir_escaped}')
-workflow_ids_json = r'{workflow_ids_json_escaped}'
-sys.argv = [r'{script_path_escaped}', workflow_ids_json"""
-                    
-                    if hf_token:
-                        hf_token_escaped = escape_for_raw_string(hf_token)
-                        wrapper_code += f", r'{hf_token_escaped}'"
-                    
-                    wrapper_code += f"""]
-with open(r'{script_path_escaped}', 'r', encoding='utf-8') as f:
-    code = compile(f.read(), r'{script_path_escaped}', 'exec')
-    exec(code, {{'__file__': r'{script_path_escaped}', '__name__': '__main__'}})
-"""
-                    
-                    cmd = get_python_cmd() + ['-c', wrapper_code]
+                    # -m (run from web_dir) lets the wrapper's bytecode be cached between tasks
+                    cmd = [*get_python_cmd(), '-m', 'nitra_wrapper']
                     
                     # Force unbuffered Python output for real-time progress bars
                     env['PYTHONUNBUFFERED'] = '1'
                     
-                    # Start the process with Popen (trackable by queue system)
-                    # Run from web_dir so setup_modules can be found, but PYTHONPATH includes temp_dir for model_downloads
-                    process = subprocess.Popen(
-                        cmd,
-                        text=True,
-                        env=env,
-                        cwd=web_dir,  # Run from web directory where setup_modules is located
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE,
-                        bufsize=0,  # Unbuffered for real-time progress
-                        creationflags=WINDOWS_CREATE_NEW_PROCESS_GROUP
-                    )
-                    
-                    # Start threads to stream output to terminal
-                    stdout_thread = threading.Thread(target=handle_stream, args=(process.stdout, ""))
-                    stderr_thread = threading.Thread(target=handle_stream, args=(process.stderr, "[!]"))
-                    
-                    stdout_thread.start()
-                    stderr_thread.start()
-                    
-                    # Track the process for cancellation
-                    with task_worker_lock:
-                        running_processes[task_id] = {
-                            'process': process,
-                            'stdout_thread': stdout_thread,
-                            'stderr_thread': stderr_thread,
-                            'type': 'workflow',
-                            'script_runner': runner  # Keep reference for cleanup
-                        }
-                    
-                    # Wait for completion
-                    return_code = process.wait()
-                    
-                    # Clean up threads
-                    stdout_thread.join()
-                    stderr_thread.join()
-                    
-                    # Clean up script runner (delete temp directory containing both workflow_downloader.py and model_downloads.py)
-                    try:
-                        runner.cleanup()
-                    except Exception as cleanup_error:
-                        debug_log(f"Error cleaning up script runner for task {task_id}: {cleanup_error}")
-                    
-                    # Remove from running processes
-                    with task_worker_lock:
-                        if task_id in running_processes:
-                            del running_processes[task_id]
+                    # Run from web_dir so setup_modules can be found; the runner's temp dir is removed once it exits
+                    return_code = await _run_tracked_subprocess(task_id, cmd, env, web_dir, 'workflow', script_runner=runner)
                 
-            except Exception as script_error:
+            except Exception:
                 # Script runner error - silent fallback to subprocess
                 # Clean up script runner if it was created
                 try:
                     if 'runner' in locals():
-                        runner.cleanup()
+                        await asyncio.to_thread(runner.cleanup)
                     if 'model_downloads_runner' in locals():
                         # model_downloads_runner should already be cleaned up after copy, but clean up just in case
-                        model_downloads_runner.cleanup()
-                except:
+                        await asyncio.to_thread(model_downloads_runner.cleanup)
+                except Exception:  # not bare: let task cancellation propagate
                     pass
                 # Fall back to original subprocess execution
                 cmd = task_data['cmd']
                 
-                # Start the process with Popen (ComfyUI-Manager approach)
-                process = subprocess.Popen(
-                    cmd,
-                    text=True,
-                    env=env,
-                    cwd=cwd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    bufsize=1,
-                    creationflags=WINDOWS_CREATE_NEW_PROCESS_GROUP
-                )
-                
-                # Start threads to stream output to terminal
-                stdout_thread = threading.Thread(target=handle_stream, args=(process.stdout, ""))
-                stderr_thread = threading.Thread(target=handle_stream, args=(process.stderr, "[!]"))
-                
-                stdout_thread.start()
-                stderr_thread.start()
-                
-                # Track the process for cancellation
-                with task_worker_lock:
-                    running_processes[task_id] = {
-                        'process': process,
-                        'stdout_thread': stdout_thread,
-                        'stderr_thread': stderr_thread,
-                        'type': 'workflow'
-                    }
-                
-                # Wait for completion
-                return_code = process.wait()
-                
-                # Clean up threads
-                stdout_thread.join()
-                stderr_thread.join()
-                
-                # Remove from running processes
-                with task_worker_lock:
-                    if task_id in running_processes:
-                        del running_processes[task_id]
+                # Run as a tracked (cancellable) subprocess; output is pumped asynchronously
+                return_code = await _run_tracked_subprocess(task_id, cmd, env, cwd, 'workflow')
                 
         else:
             # Use original subprocess execution for local scripts
             cmd = task_data['cmd']
             
-            # Start the process with Popen (ComfyUI-Manager approach)
-            process = subprocess.Popen(
-                cmd,
-                text=True,
-                env=env,
-                cwd=cwd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                bufsize=1,
-                creationflags=WINDOWS_CREATE_NEW_PROCESS_GROUP
-            )
-            
-            # Start threads to stream output to terminal
-            stdout_thread = threading.Thread(target=handle_stream, args=(process.stdout, ""))
-            stderr_thread = threading.Thread(target=handle_stream, args=(process.stderr, "[!]"))
-            
-            stdout_thread.start()
-            stderr_thread.start()
-            
-            # Track the process for cancellation
-            with task_worker_lock:
-                running_processes[task_id] = {
-                    'process': process,
-                    'stdout_thread': stdout_thread,
-                    'stderr_thread': stderr_thread,
-                    'type': 'workflow'
-                }
-            
-            # Wait for completion
-            return_code = process.wait()
-            
-            # Clean up threads
-            stdout_thread.join()
-            stderr_thread.join()
-            
-            # Remove from running processes
-            with task_worker_lock:
-                if task_id in running_processes:
-                    del running_processes[task_id]
+            # Run as a tracked (cancellable) subprocess; output is pumped asynchronously
+            return_code = await _run_tracked_subprocess(task_id, cmd, env, cwd, 'workflow')
             
         
-    except Exception as e:
+    except Exception:
         # Error executing workflow task - silent error handling
         # Clean up script runner if it exists in running_processes
+        # (detached under the lock, cleaned up outside it so other tasks are not held up)
         with task_worker_lock:
-            if task_id in running_processes:
-                process_info = running_processes[task_id]
-                script_runner = process_info.get('script_runner')
-                if script_runner:
-                    try:
-                        script_runner.cleanup()
-                    except Exception as cleanup_error:
-                        debug_log(f"Error cleaning up script runner on error: {cleanup_error}")
-                del running_processes[task_id]
+            process_info = running_processes.pop(task_id, None)
+        script_runner = process_info.get('script_runner') if process_info else None
+        if script_runner:
+            try:
+                await asyncio.to_thread(script_runner.cleanup)
+            except Exception as cleanup_error:
+                debug_log(f"Error cleaning up script runner on error: {cleanup_error}")
 
-def execute_model_task(task_data):
+async def execute_model_task(task_data):
     """Execute a model installation task using script runner system"""
     task_id = task_data['id']
     _register_promptserver_shutdown()
@@ -911,271 +1505,118 @@ def execute_model_task(task_data):
         if not USE_LOCAL_SCRIPTS:
             
             try:
-                # Import script runner
-                import sys
-                web_dir = os.path.join(os.path.dirname(__file__), 'web')
-                if web_dir not in sys.path:
-                    sys.path.insert(0, web_dir)
-                
-                from script_runner import ScriptRunner
+                web_dir = WEB_DIR
+                ScriptRunner = _script_runner_class()
                 
                 # Create script runner and execute
                 configs_url = f'{WEBSITE_BASE_URL}/api'
                 runner = ScriptRunner(access_token=access_token, configs_url=configs_url)
                 
                 # Download the script first
-                if runner.download_script('model_downloads', local_test=False):
+                # ScriptRunner does blocking network/file I/O, so it runs in a worker thread
+                if await asyncio.to_thread(runner.download_script, 'model_downloads', local_test=False):
                     
                     # Create a subprocess for the downloaded script that can be tracked/cancelled
                     script_path = runner.script_path
                     
-                    # Set working directory to web directory where setup_modules is located
-                    web_dir = os.path.join(os.path.dirname(__file__), 'web')
-                    
                     # Get the temp directory where scripts are located
                     script_temp_dir = os.path.dirname(script_path)
                     
                     # Update environment with proper Python path
                     # Include both the temp directory (for any imports) and web_dir (for setup_modules)
                     # Put temp directory first so any script imports can be found
-                    pythonpath_parts = [script_temp_dir, web_dir]
-                    if 'PYTHONPATH' in env:
-                        existing_path = env['PYTHONPATH']
-                        if existing_path and existing_path not in pythonpath_parts:
-                            pythonpath_parts.append(existing_path)
-                    env['PYTHONPATH'] = os.pathsep.join(pythonpath_parts)
-                    
-                    # Build command with explicit sys.path manipulation to ensure setup_modules is found
-                    # Python adds the script's directory to sys.path[0], but we need web_dir there too
-                    # Create a Python wrapper that sets up sys.path before executing the script
-                    model_ids_json = json.dumps(model_ids)
+                    env['PYTHONPATH'] = (script_temp_dir + os.pathsep + _WEB_DIR_PATHSEP + env.get('PYTHONPATH', '')).rstrip(os.pathsep)
                     
-                    # Escape paths for Python raw strings (r'...')
-                    # For raw strings, we only need to escape backslashes and quotes
-                    def escape_for_raw_string(s):
-                        return s.replace('\\', '\\\\').replace("'", "\\'")
+                    # Run the script through the same static web/nitra_wrapper.py entry point as workflow
+                    # tasks: it puts web_dir and the temp dir on sys.path and rebuilds sys.argv
+                    env['NITRA_WEB_DIR'] = web_dir
+                    env['NITRA_SCRIPT_PATH'] = script_path
+                    # IDs travel as a file in the script's temp dir (removed with it by runner.cleanup())
+                    ids_path = os.path.join(script_temp_dir, 'model_ids.json')
+                    with open(ids_path, 'w', encoding='utf-8') as ids_file:
+                        json.dump(model_ids, ids_file)
+                    env['NITRA_IDS_FILE'] = ids_path
+                    env['NITRA_HF_TOKEN'] = hf_token or ''
                     
-                    web_dir_escaped = escape_for_raw_string(web_dir)
-                    script_temp_dir_escaped = escape_for_raw_string(script_temp_dir)
-                    script_path_escaped = escape_for_raw_string(script_path)
-                    model_ids_json_escaped = escape_for_raw_string(model_ids_json)
-                    
-                    # Create wrapper code that:
-                    # 1. Adds web_dir and script_temp_dir to sys.path (web_dir first for setup_modules)
-                    # 2. Sets sys.argv with model_ids and optional hf_token
-                    # 3. Executes the script with proper __file__ context
-                    wrapper_code = f"""import sys, os, json
-sys.path.insert(0, r'{web_dir_escaped}')
-sys.path.insert(1, r'{script_temp_dir_escaped}')
-model_ids_json = r'{model_ids_json_escaped}'
-sys.argv = [r'{script_path_escaped}', model_ids_json"""
-                    
-                    if hf_token:
-                        hf_token_escaped = escape_for_raw_string(hf_token)
-                        wrapper_code += f", r'{hf_token_escaped}'"
-                    
-                    wrapper_code += f"""]
-with open(r'{script_path_escaped}', 'r', encoding='utf-8') as f:
-    code = compile(f.read(), r'{script_path_escaped}', 'exec')
-    exec(code, {{'__file__': r'{script_path_escaped}', '__name__': '__main__'}})
-"""
-                    
-                    cmd = get_python_cmd() + ['-c', wrapper_code]
+                    # -m (run from web_dir) lets the wrapper's bytecode be cached between tasks
+                    cmd = [*get_python_cmd(), '-m', 'nitra_wrapper']
                     
                     # Force unbuffered Python output for real-time progress bars
                     env['PYTHONUNBUFFERED'] = '1'
                     
-                    # Start the process with Popen (trackable by queue system)
-                    # Run from web_dir so setup_modules can be found, but PYTHONPATH includes temp_dir for imports
-                    process = subprocess.Popen(
-                        cmd,
-                        text=True,
-                        env=env,
-                        cwd=web_dir,  # Run from web directory where setup_modules is located
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.PIPE,
-                        bufsize=0,  # Unbuffered for real-time progress
-                        creationflags=WINDOWS_CREATE_NEW_PROCESS_GROUP
-                    )
-                    
-                    # Start threads to stream output to terminal
-                    stdout_thread = threading.Thread(target=handle_stream, args=(process.stdout, ""))
-                    stderr_thread = threading.Thread(target=handle_stream, args=(process.stderr, "[!]"))
-                    
-                    stdout_thread.start()
-                    stderr_thread.start()
-                    
-                    # Track the process for cancellation
-                    with task_worker_lock:
-                        running_processes[task_id] = {
-                            'process': process,
-                            'stdout_thread': stdout_thread,
-                            'stderr_thread': stderr_thread,
-                            'type': 'model',
-                            'script_runner': runner  # Keep reference for cleanup
-                        }
-                    
-                    # Wait for completion
-                    return_code = process.wait()
-                    
-                    # Clean up threads
-                    stdout_thread.join()
-                    stderr_thread.join()
-                    
-                    # Clean up script runner (delete temp directory)
-                    try:
-                        runner.cleanup()
-                    except Exception as cleanup_error:
-                        debug_log(f"Error cleaning up script runner for task {task_id}: {cleanup_error}")
-                    
-                    # Remove from running processes
-                    with task_worker_lock:
-                        if task_id in running_processes:
-                            del running_processes[task_id]
+                    # Run from web_dir so setup_modules can be found; the runner's temp dir is removed once it exits
+                    return_code = await _run_tracked_subprocess(task_id, cmd, env, web_dir, 'model', script_runner=runner)
                 
             except Exception as script_error:
                 debug_log(f"Script runner error for model task: {script_error}")
                 # Clean up script runner if it was created
                 try:
                     if 'runner' in locals():
-                        runner.cleanup()
-                except:
+                        await asyncio.to_thread(runner.cleanup)
+                except Exception:  # not bare: let task cancellation propagate
                     pass
                 # Fall back to original subprocess execution
                 cmd = task_data['cmd']
                 
-                # Start the process with Popen (ComfyUI-Manager approach)
-                process = subprocess.Popen(
-                    cmd,
-                    text=True,
-                    env=env,
-                    cwd=cwd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    bufsize=1,
-                    creationflags=WINDOWS_CREATE_NEW_PROCESS_GROUP
-                )
-                
-                # Start threads to stream output to terminal
-                stdout_thread = threading.Thread(target=handle_stream, args=(process.stdout, ""))
-                stderr_thread = threading.Thread(target=handle_stream, args=(process.stderr, "[!]"))
-                
-                stdout_thread.start()
-                stderr_thread.start()
-                
-                # Track the process for cancellation
-                with task_worker_lock:
-                    running_processes[task_id] = {
-                        'process': process,
-                        'stdout_thread': stdout_thread,
-                        'stderr_thread': stderr_thread,
-                        'type': 'model'
-                    }
-                
-                # Wait for completion
-                return_code = process.wait()
-                
-                # Clean up threads
-                stdout_thread.join()
-                stderr_thread.join()
-                
-                # Remove from running processes
-                with task_worker_lock:
-                    if task_id in running_processes:
-                        del running_processes[task_id]
+                # Run as a tracked (cancellable) subprocess; output is pumped asynchronously
+                return_code = await _run_tracked_subprocess(task_id, cmd, env, cwd, 'model')
                 
         else:
             # Use original subprocess execution for local scripts
             cmd = task_data['cmd']
             
-            # Start the process with Popen (ComfyUI-Manager approach)
-            process = subprocess.Popen(
-                cmd,
-                text=True,
-                env=env,
-                cwd=cwd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                bufsize=1,
-                creationflags=WINDOWS_CREATE_NEW_PROCESS_GROUP
-            )
-            
-            # Start threads to stream output to terminal
-            stdout_thread = threading.Thread(target=handle_stream, args=(process.stdout, ""))
-            stderr_thread = threading.Thread(target=handle_stream, args=(process.stderr, "[!]"))
-            
-            stdout_thread.start()
-            stderr_thread.start()
-            
-            # Track the process for cancellation
-            with task_worker_lock:
-                running_processes[task_id] = {
-                    'process': process,
-                    'stdout_thread': stdout_thread,
-                    'stderr_thread': stderr_thread,
-                    'type': 'model'
-                }
-            
-            # Wait for completion
-            return_code = process.wait()
-            
-            # Clean up threads
-            stdout_thread.join()
-            stderr_thread.join()
-            
-            # Remove from running processes
-            with task_worker_lock:
-                if task_id in running_processes:
-                    del running_processes[task_id]
+            # Run as a tracked (cancellable) subprocess; output is pumped asynchronously
+            return_code = await _run_tracked_subprocess(task_id, cmd, env, cwd, 'model')
             
         
     except Exception as e:
         debug_log(f"Error executing model task: {e}")
         # Clean up script runner if it exists in running_processes
+        # (detached under the lock, cleaned up outside it so other tasks are not held up)
         with task_worker_lock:
-            if task_id in running_processes:
-                process_info = running_processes[task_id]
-                script_runner = process_info.get('script_runner')
-                if script_runner:
-                    try:
-                        script_runner.cleanup()
-                    except Exception as cleanup_error:
-                        debug_log(f"Error cleaning up script runner on error: {cleanup_error}")
-                del running_processes[task_id]
+            process_info = running_processes.pop(task_id, None)
+        script_runner = process_info.get('script_runner') if process_info else None
+        if script_runner:
+            try:
+                await asyncio.to_thread(script_runner.cleanup)
+            except Exception as cleanup_error:
+                debug_log(f"Error cleaning up script runner on error: {cleanup_error}")
+
+# The UI polls subscription status on mount and repeatedly afterwards; answer repeats
+# from memory for a few seconds. Keyed by user and a token digest (never the raw token)
+SUBSCRIPTION_CACHE_TTL_SECONDS = 8.0
+SUBSCRIPTION_CACHE_MAX_ENTRIES = 1024
+_subscription_cache: "collections.OrderedDict[Tuple[str, str], Tuple[float, Dict[str, Any]]]" = collections.OrderedDict()
+
+
+def _subscription_cache_key(user_id: str, access_token: str) -> Tuple[str, str]:
+    return user_id, hashlib.blake2b(access_token.encode('utf-8'), digest_size=8).hexdigest()
+
 
 @routes.post('/nitra/auth/subscription-check')
+@require_bearer
 async def get_subscription_check(request):
     """Get license status for authenticated user"""
     try:
-        # Basic auth check (verify token is present)
-        auth_header = request.headers.get('Authorization', '')
-        if not auth_header.startswith('Bearer '):
-            return web.json_response(
-                {"error": "Missing or invalid authorization header"}, 
-                status=401
-            )
-        
-        access_token = auth_header[7:]  # Remove 'Bearer ' prefix
-        
-        if not access_token:
-            return web.json_response(
-                {"error": "Missing access token"}, 
-                status=401
-            )
+        access_token = request['access_token']
         
         # Get user ID from request body (frontend should provide this)
-        data = await request.json()
+        data = _jloads(await request.read())
         user_id = data.get('userId', '')
         
         if not user_id:
-            return web.json_response(
+            return _json_response(
                 {"error": "User ID required"}, 
                 status=400
             )
         
-        # Call your website's subscription API (matching dashboard pattern)
-        import requests
+        cache_key = _subscription_cache_key(user_id, access_token)
+        cached = _subscription_cache.get(cache_key)
+        if cached and time.monotonic() - cached[0] < SUBSCRIPTION_CACHE_TTL_SECONDS:
+            _subscription_cache.move_to_end(cache_key)
+            return _json_response(cached[1])
         
+        # Call your website's subscription API (matching dashboard pattern)
         # Call your website's subscription-check endpoint
         subscription_url = f'{WEBSITE_BASE_URL}/api/subscription-check'
         
@@ -1184,16 +1625,19 @@ async def get_subscription_check(request):
             'Authorization': f'Bearer {access_token}'
         }
         
-        # Send request to your website (exact same pattern as dashboard)
-        response = requests.post(
+        # Send request to your website (exact same pattern as dashboard), awaiting it so the
+        # event loop keeps serving other routes while the upstream call is in flight
+        session = await _get_http_session()
+        async with session.post(
             subscription_url, 
             headers=headers, 
-            timeout=30, 
+            timeout=aiohttp.ClientTimeout(total=30), 
             json={"userId": user_id}
-        )
+        ) as response:
+            response_ok = response.ok
+            subscription_data = await response.json(content_type=None, loads=_jloads) if response_ok else None
         
-        if response.ok:
-            subscription_data = response.json()
+        if response_ok:
             # Process subscription data exactly like dashboard does
             processed_data = {
                 "has_paid_subscription": subscription_data.get("has_paid_subscription", False),
@@ -1213,11 +1657,15 @@ async def get_subscription_check(request):
                 "invoice_paid_date": subscription_data.get("invoice_paid_date"),
                 "last_updated": subscription_data.get("last_updated")
             }
-            return web.json_response(processed_data)
+            _subscription_cache[cache_key] = (time.monotonic(), processed_data)
+            _subscription_cache.move_to_end(cache_key)
+            while len(_subscription_cache) > SUBSCRIPTION_CACHE_MAX_ENTRIES:
+                _subscription_cache.popitem(last=False)
+            return _json_response(processed_data)
         else:
             # Handle error like dashboard does - return free subscription
             logger.error(f"Nitra: Subscription check failed: {response.status}")
-            return web.json_response({
+            return _json_response({
                 "has_paid_subscription": False,
                 "subscription_type": "free",
                 "status": "active",
@@ -1238,82 +1686,76 @@ async def get_subscription_check(request):
         
     except Exception as e:
         logger.error(f"Nitra: License status check error: {e}")
-        return web.json_response(
+        return _json_response(
             {"error": "Internal server error"}, 
             status=500
         )
 
 
 @routes.get('/nitra/workflows-metadata')
+@require_bearer(allow_empty=True)
 async def get_workflows_metadata(request):
     """
     Get workflows metadata for preview (non-subscribers can see names/tags but not download)
     """
     try:
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return web.json_response({'error': 'Unauthorized'}, status=401)
-        
-        api_token = auth_header.split(' ')[1]
+        api_token = request['access_token']
         user_email = request.headers.get('X-User-Email', '')
         user_id = request.headers.get('X-User-Id', '')
         
         # Call website API for workflows metadata
-        import requests
         metadata_url = f'{WEBSITE_BASE_URL}/api/workflows-metadata'
         
         headers = _build_upstream_headers(api_token, user_email, user_id=user_id)
         
-        response = requests.get(metadata_url, headers=headers, timeout=30)
-        
-        if response.status_code == 200:
-            return web.json_response(response.json())
-        else:
-            logger.error(f"Workflows metadata fetch failed: {response.status_code}")
-            return web.json_response(
+        session = await _get_http_session()
+        async with session.get(metadata_url, headers=headers, timeout=aiohttp.ClientTimeout(total=30)) as response:
+            if response.status == 200:
+                return _json_response(await response.json(content_type=None, loads=_jloads))
+            logger.error(f"Workflows metadata fetch failed: {response.status}")
+            return _json_response(
                 {'error': 'Failed to fetch workflows metadata'},
-                status=response.status_code
+                status=response.status
             )
     
     except Exception as e:
         logger.error(f"Nitra: Workflows metadata error: {e}")
-        return web.json_response({'error': 'Internal server error'}, status=500)
+        return _json_response({'error': 'Internal server error'}, status=500)
 
 
 @routes.get('/nitra/models-metadata')
+@require_bearer(allow_empty=True)
 async def get_models_metadata(request):
     """
     Get models metadata for preview (non-subscribers can see names/tags but not download)
     """
     try:
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return web.json_response({'error': 'Unauthorized'}, status=401)
-        
-        api_token = auth_header.split(' ')[1]
+        api_token = request['access_token']
         user_email = request.headers.get('X-User-Email', '')
         user_id = request.headers.get('X-User-Id', '')
         
         # Call website API for models metadata
-        import requests
         metadata_url = f'{WEBSITE_BASE_URL}/api/models-metadata'
         
         headers = _build_upstream_headers(api_token, user_email, user_id=user_id)
         
-        response = requests.get(metadata_url, headers=headers, timeout=30)
-        
-        if response.status_code == 200:
-            return web.json_response(response.json())
-        else:
-            logger.error(f"Models metadata fetch failed: {response.status_code}")
-            return web.json_response(
+        session = await _get_http_session()
+        async with session.get(metadata_url, headers=headers, timeout=aiohttp.ClientTimeout(total=30)) as response:
+            if response.status == 200:
+                return _json_response(await response.json(content_type=None, loads=_jloads))
+            logger.error(f"Models metadata fetch failed: {response.status}")
+            return _json_response(
                 {'error': 'Failed to fetch models metadata'},
-                status=response.status_code
+                status=response.status
             )
     
     except Exception as e:
         logger.error(f"Nitra: Models metadata error: {e}")
-        return web.json_response({'error': 'Internal server error'}, status=500)
+        return _json_response({'error': 'Internal server error'}, status=500)
+
+
+# running_processes entry types that cancel_execution stops; register new task kinds here
+_CANCELABLE_TYPES = frozenset({'workflow', 'model', 'script', 'package'})
 
 
 @routes.post('/nitra/execute/cancel')
@@ -1325,60 +1767,58 @@ async def cancel_execution(request):
         # Get user email from request if available
         user_email = None
         try:
-            data = await request.json()
+            data = _jloads(await request.read())
             user_email = data.get('user_email')
         except Exception:
             pass
         
-        # Get all running processes related to script execution
-        cancelled_count = 0
+        # Detach script-related tasks under the lock; termination (which can wait seconds
+        # per process) happens after it is released so tracking/spawns are never held up
         with task_worker_lock:
-            # Find and terminate script-related processes
-            to_remove = []
-            for task_id, info in running_processes.items():
-                # Cancel script executions (workflow_downloader, etc.)
-                should_cancel = (
-                    'script' in task_id.lower() or 
-                    'workflow' in task_id.lower() or 
-                    'install' in task_id.lower() or
-                    'model' in task_id.lower()
-                )
-                if should_cancel:
-                    proc = info.get('process')
-                    if proc and proc.poll() is None:
-                        debug_log(f"Cancelling task: {task_id}")
-                        _terminate_child_process(proc, task_id)
-                        cancelled_count += 1
-                    # Also terminate via script runner if available
-                    script_runner = info.get('script_runner')
-                    if script_runner:
-                        try:
-                            script_runner.terminate()
-                        except Exception:
-                            pass
-                    to_remove.append(task_id)
-            
-            # Clean up terminated tasks
-            for task_id in to_remove:
-                info = running_processes.pop(task_id, {})
-                # Clean up script runner if present
+            to_cancel = [
+                (task_id, popped)
+                for task_id, info in list(running_processes.items())
+                # Cancel script executions (workflow_downloader, etc.) and installs
+                if info.get('type') in _CANCELABLE_TYPES
+                and (popped := running_processes.pop(task_id, None)) is not None
+            ]
+        
+        # Drop queued tasks before waiting on the terminations: once a cancelled install
+        # exits, the task loop would otherwise start the next queued one
+        cleared_queue = _cancel_pending_tasks()
+        if cleared_queue > 0:
+            debug_log(f"Cleared {cleared_queue} pending tasks from queue")
+        
+        live_procs = []
+        for task_id, info in to_cancel:
+            # Scripts still waiting for a pool worker never start
+            future = info.get('future')
+            if future is not None:
+                future.cancel()
+            proc = info.get('process')
+            if _is_process_running(proc):
+                debug_log(f"Cancelling task: {task_id}")
+                live_procs.append(proc)
+        cancelled_count = len(live_procs)
+        
+        def _terminate_cancelled():
+            # All processes share one grace period instead of up to 5s each
+            _terminate_child_processes(live_procs)
+            for _, info in to_cancel:
+                # Also terminate via script runner if available, then clean it up
                 script_runner = info.get('script_runner')
                 if script_runner:
+                    try:
+                        script_runner.terminate()
+                    except Exception:
+                        pass
                     try:
                         script_runner.cleanup()
                     except Exception:
                         pass
-            
-            # Also clear any pending tasks from the queue
-            cleared_queue = 0
-            try:
-                while not task_queue.empty():
-                    task_queue.get_nowait()
-                    cleared_queue += 1
-            except Exception:
-                pass
-            if cleared_queue > 0:
-                debug_log(f"Cleared {cleared_queue} pending tasks from queue")
+        
+        if to_cancel:
+            await asyncio.to_thread(_terminate_cancelled)
         
         # Clear active update status for user (if provided) or all users
         if user_email and user_email in nitra_active_updates:
@@ -1389,14 +1829,14 @@ async def cancel_execution(request):
         else:
             # Mark all active updates as cancelled
             for email in list(nitra_active_updates.keys()):
-                if nitra_active_updates[email].get('status') in ['started', 'running', 'in_progress']:
+                if nitra_active_updates.get(email, {}).get('status') in ['started', 'running', 'in_progress']:
                     nitra_active_updates[email] = {
                         'status': 'cancelled',
                         'message': 'Installation cancelled by user'
                     }
         
         debug_log(f"Cancelled {cancelled_count} running processes, cleared {cleared_queue} queued tasks")
-        return web.json_response({
+        return _json_response({
             'success': True,
             'message': f'Cancelled {cancelled_count} running process(es)',
             'cancelled_count': cancelled_count,
@@ -1405,119 +1845,143 @@ async def cancel_execution(request):
         
     except Exception as e:
         logger.error(f"Nitra: Cancel execution error: {e}")
-        return web.json_response({'error': str(e)}, status=500)
+        return _json_response({'error': str(e)}, status=500)
 
 
-@routes.post('/nitra/execute/script')
-async def execute_script(request):
-    """Execute installation scripts with authentication check"""
+# Option flag -> installer script, in priority order
+_SCRIPT_DISPATCH = (
+    ('install_torch', 'torch_updater.py'),
+    ('install_windows_triton', 'windows_triton.py'),
+    ('install_sageattention', 'sageattention.py'),
+    ('install_onnx', 'onnx_installer.py'),
+    ('model_ids', 'model_downloads.py'),
+    ('workflow_ids', 'workflow_downloader.py'),
+)
+
+
+def _has_main_py(directory: str) -> bool:
+    """Single stat probe for <directory>/main.py, the marker of a ComfyUI root."""
+    try:
+        os.stat(directory + os.sep + 'main.py')
+    except OSError:
+        return False
+    return True
+
+
+@functools.lru_cache(maxsize=1)
+def _discover_comfyui_root() -> Tuple[str, str, Optional[str], bool]:
+    """Locate the ComfyUI root (the directory holding main.py).
+
+    Returns (comfyui_root, nitra_dir, searched_cwd, validated); searched_cwd is None when
+    the root came from __file__, and validated is True when main.py was seen at the root
+    during the search. The answer cannot change while the server runs, so it is cached;
+    callers clear the cache if the result fails validation.
+    """
+    current_dir = None
+    validated = True
+    # Build path relative to ComfyUI root - use __file__ first as it's most reliable
+    try:
+        # Get the directory where this server file is located
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        debug_log(f"Script directory from __file__: {script_dir}")
+        # Navigate up from custom_nodes/ComfyUI-Nitra/ to ComfyUI root
+        comfyui_root = os.path.dirname(os.path.dirname(script_dir))
+        debug_log(f"Detected ComfyUI root from __file__: {comfyui_root}")
+
+        # Validate that we found a valid ComfyUI root
+        if not _has_main_py(comfyui_root):
+            debug_log("main.py not found at detected root, trying alternative methods...")
+            raise ValueError("main.py not found")
+    except Exception as e:
+        debug_log(f"Could not use __file__ for path detection: {e}, falling back to cwd")
+
+        # Fall back to cwd-based detection
+        current_dir = os.getcwd()
+        debug_log(f"Current working directory: {current_dir}")
+        comfyui_root = current_dir
+
+        # Check if we're already in ComfyUI root (main.py exists)
+        if not _has_main_py(current_dir):
+            debug_log("main.py not found in current dir, searching parent directories...")
+            validated = False
+            # If not, walk up the directory tree to find main.py
+            search_dir = current_dir
+            for i in range(5):  # Limit search depth
+                parent_dir = os.path.dirname(search_dir)
+                debug_log(f"Search iteration {i}: checking {parent_dir}")
+                if parent_dir == search_dir:  # Reached filesystem root
+                    debug_log("Reached filesystem root, stopping search")
+                    break
+                if not _has_main_py(parent_dir):
+                    search_dir = parent_dir
+                    continue
+                comfyui_root = parent_dir
+                validated = True
+                debug_log(f"Found main.py! ComfyUI root: {comfyui_root}")
+                break
+        else:
+            debug_log("Found main.py in current directory")
+
+    nitra_dir = os.path.join(comfyui_root, 'custom_nodes', 'ComfyUI-Nitra', 'web')
+    return comfyui_root, nitra_dir, current_dir, validated
+
+
+async def _execute_script_core(request, data, is_http: bool):
+    """Execute installation scripts with authentication check.
+
+    Shared body of execute_script (HTTP: request set, data parsed here) and
+    execute_script_internal (data dict, returns a dict instead of a response).
+    """
     try:
         debug_log("=== EXECUTE_SCRIPT FUNCTION CALLED ===")
         debug_log("Received execute request")
         
-        # Parse request data - handle both request objects and dict objects
-        if hasattr(request, 'json'):
-            # This is a proper request object from HTTP
-            data = await request.json()
-        else:
-            # This is a dict object from internal calls
-            data = request
+        if is_http:
+            data = _jloads(await request.read())
         
-        debug_log(f"Request data: {data}")
+        debug_log("Request data: %s", data)
         
         user_id = data.get('user_id')
         user_email = data.get('user_email') 
         options = data.get('options', {})
         script_filename = data.get('script_filename', 'windows_triton.py')
+        # Read the option values used below once
+        torch_version = options.get('torch_version')
+        cuda_version = options.get('cuda_version')
+        model_ids = options.get('model_ids')
+        hf_token = options.get('huggingface_token')
         
-        debug_log(f"Parsed data - user_id: {user_id}, user_email: {user_email}, script: {script_filename}")
+        debug_log("Parsed data - user_id: %s, user_email: %s, script: %s", user_id, user_email, script_filename)
         
         debug_log("Starting path detection...")
         
-        # Build path relative to ComfyUI root - use __file__ first as it's most reliable
-        try:
-            # Get the directory where this server file is located
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            debug_log(f"Script directory from __file__: {script_dir}")
-            # Navigate up from custom_nodes/ComfyUI-Nitra/ to ComfyUI root
-            comfyui_root = os.path.dirname(os.path.dirname(script_dir))
-            debug_log(f"Detected ComfyUI root from __file__: {comfyui_root}")
-            
-            # Validate that we found a valid ComfyUI root
-            if not os.path.exists(os.path.join(comfyui_root, 'main.py')):
-                debug_log("main.py not found at detected root, trying alternative methods...")
-                raise ValueError("main.py not found")
-        except Exception as e:
-            debug_log(f"Could not use __file__ for path detection: {e}, falling back to cwd")
-            
-            # Fall back to cwd-based detection
-            current_dir = os.getcwd()
-            debug_log(f"Current working directory: {current_dir}")
-            comfyui_root = current_dir
-            
-            # Check if we're already in ComfyUI root (main.py exists)
-            main_py_path = os.path.join(current_dir, 'main.py')
-            debug_log(f"Checking for main.py at: {main_py_path}")
-            
-            if not os.path.exists(main_py_path):
-                debug_log("main.py not found in current dir, searching parent directories...")
-                # If not, walk up the directory tree to find main.py
-                search_dir = current_dir
-                for i in range(5):  # Limit search depth
-                    parent_dir = os.path.dirname(search_dir)
-                    debug_log(f"Search iteration {i}: checking {parent_dir}")
-                    if parent_dir == search_dir:  # Reached filesystem root
-                        debug_log("Reached filesystem root, stopping search")
-                        break
-                    parent_main = os.path.join(parent_dir, 'main.py')
-                    debug_log(f"Checking for main.py at: {parent_main}")
-                    if os.path.exists(parent_main):
-                        comfyui_root = parent_dir
-                        debug_log(f"Found main.py! ComfyUI root: {comfyui_root}")
-                        break
-                    search_dir = parent_dir
-            else:
-                debug_log("Found main.py in current directory")
-        
-        nitra_dir = os.path.join(comfyui_root, 'custom_nodes', 'ComfyUI-Nitra', 'web')
+        comfyui_root, nitra_dir, current_dir, root_validated = _discover_comfyui_root()
         
-        # Determine which script to execute based on options
-        if options.get('install_torch'):
-            script_filename = 'torch_updater.py'
-            torch_version = options.get('torch_version')
-            cuda_version = options.get('cuda_version')
+        # Determine which script to execute based on options (first matching option wins,
+        # otherwise keep the requested script)
+        script_filename = next(
+            (filename for option, filename in _SCRIPT_DISPATCH if options.get(option)),
+            script_filename,
+        )
+        if script_filename == 'torch_updater.py' and options.get('install_torch'):
             if not torch_version or not cuda_version:
                 raise ValueError("Missing torch_version or cuda_version for torch installation")
-        elif options.get('install_windows_triton'):
-            script_filename = 'windows_triton.py'
-        elif options.get('install_sageattention'):
-            script_filename = 'sageattention.py'
-        elif options.get('install_onnx'):
-            script_filename = 'onnx_installer.py'
-        elif options.get('model_ids'):
-            script_filename = 'model_downloads.py'
-        elif options.get('workflow_ids'):
-            script_filename = 'workflow_downloader.py'
-        elif script_filename == 'windows_triton.py':
-            # Default to windows_triton for basic setup
-            script_filename = 'windows_triton.py'
         
         full_script_path = os.path.join(nitra_dir, script_filename)
         
-        debug_log(f"Detected ComfyUI root: {comfyui_root}")
-        debug_log(f"Nitra directory: {nitra_dir}")
-        debug_log(f"Script path: {full_script_path}")
+        debug_log("Detected ComfyUI root: %s", comfyui_root)
+        debug_log("Nitra directory: %s", nitra_dir)
+        debug_log("Script path: %s", full_script_path)
         
         debug_log("Validating paths...")
         
-        # Validate that we found a valid ComfyUI root
-        final_main_check = os.path.join(comfyui_root, 'main.py')
-        debug_log(f"Final validation - checking {final_main_check}")
-        
-        if not os.path.exists(final_main_check):
+        # Validate that we found a valid ComfyUI root (discovery already saw main.py
+        # unless the parent search came up empty)
+        if not root_validated:
+            _discover_comfyui_root.cache_clear()
             error_msg = f"Could not locate ComfyUI root directory. Searched from: {current_dir}, Found: {comfyui_root}"
-            debug_log(f"ERROR: {error_msg}")
-            return web.json_response(
+            debug_log("ERROR: %s", error_msg)
+            return _json_response(
                 {"error": error_msg, "current_dir": current_dir, "detected_root": comfyui_root}, 
                 status=500
             )
@@ -1527,45 +1991,42 @@ async def execute_script(request):
         debug_log("Checking authentication...")
         
         # Basic auth check (verify token is present)
-        if hasattr(request, 'headers'):
-            # This is a proper request object from HTTP
-            auth_header = request.headers.get('Authorization', '')
+        if is_http:
+            access_token = _extract_bearer(request)
         else:
-            # This is a dict object from internal calls - extract token from data
-            auth_header = data.get('access_token', '')
-            if auth_header and not auth_header.startswith('Bearer '):
-                auth_header = f'Bearer {auth_header}'
+            # This is a dict object from internal calls - token may come with or without the prefix
+            raw_token = data.get('access_token') or ''
+            access_token = (raw_token[7:] if raw_token.startswith('Bearer ') else raw_token) or None
         
-        debug_log(f"Auth header present: {bool(auth_header)}")
+        debug_log("Auth header present: %s", access_token is not None)
         
-        if not auth_header.startswith('Bearer '):
+        if access_token is None:
             debug_log("Missing or invalid Bearer token")
-            return web.json_response(
+            return _json_response(
                 {"error": "Authentication required"}, 
                 status=401
             )
         
-        token = auth_header.replace('Bearer ', '')
-        debug_log(f"Execute request from user {user_email} with token: {_mask_token_preview(token)}")
+        debug_log("Execute request from user %s with token: %s", user_email, _mask_token_preview(access_token))
         if not user_id:
-            return web.json_response(
+            return _json_response(
                 {"error": "User ID is required to execute installer scripts."},
                 status=400,
             )
         try:
-            _require_subscription_and_device(token, user_id, user_email)
+            await _require_subscription_and_device(access_token, user_id, user_email)
         except SubscriptionVerificationError as exc:
-            return web.json_response({"error": str(exc)}, status=403)
+            return _json_response({"error": str(exc)}, status=403)
         except DeviceVerificationError as exc:
-            return web.json_response({"error": str(exc)}, status=428)
-        debug_log(f"Using script path: {full_script_path}")
+            return _json_response({"error": str(exc)}, status=428)
+        debug_log("Using script path: %s", full_script_path)
         
         debug_log("Checking script file exists...")
         
         # Only validate local script path if using local scripts
         if USE_LOCAL_SCRIPTS and not os.path.exists(full_script_path):
-            debug_log(f"Script not found at: {full_script_path}")
-            return web.json_response(
+            debug_log("Script not found at: %s", full_script_path)
+            return _json_response(
                 {"error": f"Script not found: {full_script_path}"}, 
                 status=404
             )
@@ -1574,23 +2035,21 @@ async def execute_script(request):
         
         debug_log("Script file exists, proceeding with execution setup...")
         
-        # Extract access token for API calls
-        access_token = auth_header.replace('Bearer ', '')
-        debug_log("Extracted access token")
-        
         debug_log("Preparing environment variables...")
         
         # Prepare environment variables for the script
-        env = os.environ.copy()
-        env.update({
+        # Serialized once: used for the env var and, for workflow_downloader, the argv payload
+        options_json = _jdumps(options)
+        env = {
+            **os.environ,
             'NITRA_USER_ID': user_id or 'unknown',
             'NITRA_USER_EMAIL': user_email or 'unknown',
             'NITRA_ACCESS_TOKEN': access_token,
-            'NITRA_UPDATE_OPTIONS': json.dumps(options),
+            'NITRA_UPDATE_OPTIONS': options_json,
             'NITRA_CONFIGS_URL': f'{WEBSITE_BASE_URL}/api',
             'COMFY_DIR': comfyui_root,  # Explicitly set the correct ComfyUI root directory
             'VENV_DIR': os.path.join(comfyui_root, 'venv')  # Ensure venv is in the correct location
-        })
+        }
         device_token, fingerprint_hash = _get_device_context()
         if device_token:
             env['NITRA_DEVICE_TOKEN'] = device_token
@@ -1598,24 +2057,24 @@ async def execute_script(request):
             env['NITRA_DEVICE_FINGERPRINT'] = fingerprint_hash
         env['NITRA_WEBSITE_URL'] = WEBSITE_BASE_URL
         
-        debug_log(f"Starting {script_filename} execution for user {user_email}")
-        debug_log(f"Update options: {options}")
-        debug_log(f"COMFY_DIR set to: {comfyui_root}")
-        debug_log(f"VENV_DIR set to: {os.path.join(comfyui_root, 'venv')}")
+        debug_log("Starting %s execution for user %s", script_filename, user_email)
+        debug_log("Update options: %s", options)
+        debug_log("COMFY_DIR set to: %s", comfyui_root)
+        debug_log("VENV_DIR set to: %s%svenv", comfyui_root, os.sep)
         debug_log("Environment variables prepared")
         
         debug_log("Performing pre-checks...")
         
         # Pre-check for license before starting update
         if not user_id or not user_email or not access_token:
-            debug_log(f"License validation failed for user {user_email} - missing authentication")
-            debug_log(f"user_id={user_id}, user_email={user_email}, token_present={bool(access_token)}")
+            debug_log("License validation failed for user %s - missing authentication", user_email)
+            debug_log("user_id=%s, user_email=%s, token_present=%s", user_id, user_email, bool(access_token))
             nitra_active_updates[user_email] = {
                 'status': 'failed', 
                 'error': 'You do not have a valid license. Please purchase a license to receive updates.',
                 'error_type': 'license'
             }
-            return web.json_response({
+            return _json_response({
                 "status": "failed",
                 "message": "License validation failed",
                 "error": "You do not have a valid license. Please purchase a license to receive updates."
@@ -1628,45 +2087,45 @@ async def execute_script(request):
         # Mark update as started for this user
         nitra_active_updates[user_email] = {
             'status': 'running',
-            'start_time': asyncio.get_event_loop().time(),
+            'start_time': time.monotonic(),
             'options': options
         }
         
         debug_log("Preparing subprocess execution...")
         
         # Execute the script as subprocess for better isolation
-        import subprocess
-        import sys
-        cmd = get_python_cmd() + [full_script_path]
+        cmd = [*get_python_cmd(), full_script_path]
         
         # Add arguments for specific modules that need them
         if script_filename == 'torch_updater.py':
             # Pass torch version and CUDA version as arguments
-            cmd.append(options.get('torch_version'))
-            cmd.append(options.get('cuda_version'))
-            debug_log(f"Adding torch arguments: {options.get('torch_version')} {options.get('cuda_version')}")
-        elif script_filename == 'model_downloads.py' and options.get('model_ids'):
+            cmd.append(torch_version)
+            cmd.append(cuda_version)
+            debug_log("Adding torch arguments: %s %s", torch_version, cuda_version)
+        elif script_filename == 'model_downloads.py' and model_ids:
             # Pass model IDs as JSON argument
-            model_ids_json = json.dumps(options.get('model_ids'))
+            model_ids_json = _jdumps(model_ids)
             cmd.append(model_ids_json)
-            debug_log(f"Adding model IDs argument: {model_ids_json}")
+            if logger.isEnabledFor(logging.DEBUG):
+                debug_log("Adding model IDs argument: %s", model_ids_json)
         elif script_filename == 'workflow_downloader.py':
             # For workflow_downloader, pass full options payload (even if workflow_ids is empty)
-            workflow_payload_json = json.dumps(options)
-            cmd.append(workflow_payload_json)
-            debug_log(f"Adding workflow payload argument: {workflow_payload_json}")
+            cmd.append(options_json)
+            debug_log("Adding workflow payload argument: %s", options_json)
         
         # Add HuggingFace token if provided (second argument for scripts that accept it)
-        if options.get('huggingface_token'):
-            cmd.append(options.get('huggingface_token'))
+        if hf_token:
+            cmd.append(hf_token)
             debug_log("Adding HuggingFace token argument")
         
-        debug_log(f"Executing command: {' '.join(cmd)}")
-        debug_log(f"Working directory: {comfyui_root}")
-        debug_log(f"Timeout: 300 seconds")
-        debug_log(f"USE_LOCAL_SCRIPTS flag: {USE_LOCAL_SCRIPTS}")
-        debug_log(f"USE_LOCAL_SCRIPTS type: {type(USE_LOCAL_SCRIPTS)}")
-        debug_log(f"not USE_LOCAL_SCRIPTS: {not USE_LOCAL_SCRIPTS}")
+        # Only built for the debug log: the argv can hold large JSON payloads and tokens
+        if logger.isEnabledFor(logging.DEBUG):
+            debug_log("Executing command: %s", ' '.join(cmd))
+        debug_log("Working directory: %s", comfyui_root)
+        debug_log("Timeout: 300 seconds")
+        debug_log("USE_LOCAL_SCRIPTS flag: %s", USE_LOCAL_SCRIPTS)
+        debug_log("USE_LOCAL_SCRIPTS type: %s", type(USE_LOCAL_SCRIPTS))
+        debug_log("not USE_LOCAL_SCRIPTS: %s", not USE_LOCAL_SCRIPTS)
         
         # Force test the script runner system
         if USE_LOCAL_SCRIPTS == False:
@@ -1679,41 +2138,22 @@ async def execute_script(request):
                 # Use the script runner system for S3 download and execution
                 
                 try:
-                    # Import script runner
-                    import sys
-                    web_dir = os.path.join(os.path.dirname(__file__), 'web')
-                    if web_dir not in sys.path:
-                        sys.path.insert(0, web_dir)
-                    
-                    debug_log(f"Importing script runner from: {web_dir}")
-                    from script_runner import ScriptRunner
+                    ScriptRunner = _script_runner_class()
                     debug_log("Script runner imported successfully")
                     
-                    # Create script runner and execute
-                    # Pass the access token from the request
-                    script_runner_token = data.get('access_token') if hasattr(data, 'get') else access_token
-                    debug_log(
-                        f"Passing access token to script runner: {_mask_token_preview(script_runner_token)}"
-                    )
+                    # Create script runner and execute with the already-validated request token
+                    debug_log("Passing access token to script runner: %s", _mask_token_preview(access_token))
                     configs_url = f'{WEBSITE_BASE_URL}/api'
                     # Ensure environment (paths/tokens) are visible to the child process
                     os.environ.update(env)
-                    runner = ScriptRunner(access_token=script_runner_token, configs_url=configs_url)
+                    runner = ScriptRunner(access_token=access_token, configs_url=configs_url)
                     
                 except Exception as import_error:
                     debug_log(f"Failed to import script runner: {import_error}")
                     debug_log("Falling back to original subprocess execution...")
                     # Fall back to original execution
-                    result = subprocess.run(
-                        cmd,
-                        text=True, 
-                        env=env, 
-                        cwd=comfyui_root, 
-                        timeout=300,
-                        stdout=None,
-                        stderr=None
-                    )
-                    debug_log(f"Subprocess completed with return code: {result.returncode}")
+                    return_code = await _run_inherited_subprocess(cmd, env, comfyui_root, timeout=300)
+                    debug_log(f"Subprocess completed with return code: {return_code}")
                     return
                 
                 # Map script filename to script name
@@ -1725,7 +2165,7 @@ async def execute_script(request):
                 debug_log(f"Running script: {script_name} with args: {args}")
                 
                 # Run the script in a background thread to allow cancellation
-                def _run_script_task(tid: str, runner_obj: ScriptRunner, s_name: str, s_args: list, u_email: str):
+                def _run_script_task(tid: str, runner_obj: Any, s_name: str, s_args: list, u_email: str):
                     try:
                         result_data = runner_obj.run_script_with_cleanup(s_name, s_args, local_test=False)
                         debug_log(f"Script runner completed with success: {result_data.get('success')}")
@@ -1751,17 +2191,22 @@ async def execute_script(request):
                             running_processes.pop(tid, None)
                 
                 task_id = f"script_{script_name}_{int(time.time())}"
+                _register_shutdown_handlers()
+                script_entry = {
+                    'process': None,  # process will be available via runner.current_process
+                    'type': 'script',
+                    'script_runner': runner
+                }
                 with task_worker_lock:
-                    running_processes[task_id] = {
-                        'process': None,  # process will be available via runner.current_process
-                        'script_runner': runner
-                    }
-                
-                t = threading.Thread(target=_run_script_task, args=(task_id, runner, script_name, args, user_email), daemon=True)
-                t.start()
+                    # Registered under the lock so a cancel that pops the entry also sees the
+                    # future, and a fast-finishing worker cannot pop it before it is stored
+                    script_entry['future'] = _SCRIPT_POOL.submit(
+                        _run_script_task, task_id, runner, script_name, args, user_email
+                    )
+                    running_processes[task_id] = script_entry
                 
                 # Return early since work continues in background
-                return web.json_response({
+                return _json_response({
                     "status": "started",
                     "success": True,
                     "message": f"{script_filename} execution started",
@@ -1775,26 +2220,17 @@ async def execute_script(request):
                 debug_log("Using original subprocess execution with local files...")
                 
                 # Don't capture output so it goes directly to terminal
-                result = subprocess.run(
-                    cmd,
-                    text=True, 
-                    env=env, 
-                    cwd=comfyui_root, 
-                    timeout=300,
-                    # Let subprocess output go directly to terminal
-                    stdout=None,  # Inherit from parent (our terminal)
-                    stderr=None   # Inherit from parent (our terminal)
-                )
-                debug_log(f"Subprocess completed with return code: {result.returncode}")
+                return_code = await _run_inherited_subprocess(cmd, env, comfyui_root, timeout=300)
+                debug_log(f"Subprocess completed with return code: {return_code}")
             
-        except subprocess.TimeoutExpired as e:
-            debug_log(f"Subprocess timed out after 300 seconds")
+        except (asyncio.TimeoutError, subprocess.TimeoutExpired) as e:
+            debug_log("Subprocess timed out after 300 seconds")
             raise e
         except Exception as e:
             debug_log(f"Script execution failed: {e}")
             raise e
         
-        if result.returncode == 0:
+        if return_code == 0:
             debug_log("Script execution completed successfully")
             nitra_active_updates[user_email] = {
                 'status': 'completed',
@@ -1808,30 +2244,26 @@ async def execute_script(request):
                 "options": options
             }
         else:
-            debug_log(f"Script execution failed with return code: {result.returncode}")
+            debug_log(f"Script execution failed with return code: {return_code}")
             nitra_active_updates[user_email] = {
                 'status': 'failed',
-                'error': f'Script failed with return code: {result.returncode}'
+                'error': f'Script failed with return code: {return_code}'
             }
             response_data = {
                 "status": "failed",
                 "success": False,
                 "message": f"{script_filename} execution failed",
-                "error": f"Return code: {result.returncode}",
+                "error": f"Return code: {return_code}",
                 "note": "Check terminal output for detailed error messages"
             }
         
         # Return appropriate response based on call type
-        if hasattr(request, 'headers'):
-            # This is an HTTP request, return web.json_response
-            return web.json_response(response_data, status=200 if response_data["status"] == "completed" else 500)
-        else:
-            # This is an internal call, return dictionary
-            return response_data
+        if is_http:
+            return _json_response(response_data, status=200 if response_data["status"] == "completed" else 500)
+        return response_data
             
     except Exception as e:
         debug_log(f"Execute script error: {e}")
-        import traceback
         debug_log(f"Full traceback: {traceback.format_exc()}")
         
         if 'user_email' in locals():
@@ -1847,327 +2279,246 @@ async def execute_script(request):
         }
         
         # Return appropriate response based on call type
-        if hasattr(request, 'headers'):
-            # This is an HTTP request, return web.json_response
-            return web.json_response(error_response, status=500)
-        else:
-            # This is an internal call, return dictionary
-            return error_response
+        if is_http:
+            return _json_response(error_response, status=500)
+        return error_response
+
+
+@routes.post('/nitra/execute/script')
+async def execute_script(request):
+    """Execute installation scripts with authentication check"""
+    return await _execute_script_core(request, None, is_http=True)
+
+
+async def execute_script_internal(data: Dict[str, Any]):
+    """Run execute_script for an in-process caller; the token comes from data['access_token']."""
+    return await _execute_script_core(None, data, is_http=False)
+
+
+def _extract_bearer(request) -> Optional[str]:
+    """Return the token from an 'Authorization: Bearer <token>' header, or None if absent/malformed."""
+    auth_header = request.headers.get('Authorization', '')
+    # Slice compare instead of startswith: no method dispatch for this per-request check
+    return auth_header[7:] if auth_header[:7] == 'Bearer ' else None
+
+
+@functools.lru_cache(maxsize=1024)
+def _email_from_jwt(access_token: str) -> Optional[str]:
+    """Return the email claim of a JWT ('' if absent), or None if the payload cannot be decoded."""
+    try:
+        # JWT tokens have 3 parts separated by dots; the payload is the middle one
+        payload_b64 = access_token.split('.')[1]
+        # JWT segments are unpadded base64url ('-'/'_' instead of '+'/'/'); restore the padding
+        payload_b64 += '=' * (-len(payload_b64) % 4)
+        payload = _jloads(base64.urlsafe_b64decode(payload_b64))
+        return payload.get('email') or payload.get('user_email', '')
+    except Exception as decode_error:
+        logger.error(f"Nitra: Failed to decode JWT token: {decode_error}")
+        return None
+
 
 @routes.get('/nitra/status/update')
+@require_bearer
 async def get_update_status(request):
     """Get update status for authenticated user"""
     try:
-        # Basic auth check (verify token is present)
-        auth_header = request.headers.get('Authorization', '')
-        if not auth_header.startswith('Bearer '):
-            return web.json_response(
-                {"error": "Missing or invalid authorization header"}, 
-                status=401
-            )
-        
-        access_token = auth_header[7:]  # Remove 'Bearer ' prefix
-        
-        if not access_token:
-            return web.json_response(
-                {"error": "Missing access token"}, 
-                status=401
-            )
+        access_token = request['access_token']
         
         # Get user email from query parameter or decode from JWT token
         user_email = request.query.get('userEmail', '')
         
-        if not user_email:
-            # Try to decode JWT token to extract user email as fallback
-            try:
-                import base64
-                import json as json_lib
-                
-                # JWT tokens have 3 parts separated by dots
-                token_parts = access_token.split('.')
-                if len(token_parts) != 3:
-                    return web.json_response(
-                        {"error": "Invalid token format"}, 
-                        status=401
-                    )
-                
-                # Decode the payload (middle part)
-                payload_b64 = token_parts[1]
-                # Add padding if needed
-                payload_b64 += '=' * (4 - len(payload_b64) % 4)
-                payload = json_lib.loads(base64.b64decode(payload_b64))
-                user_email = payload.get('email') or payload.get('user_email', '')
-                
-            except Exception as decode_error:
-                logger.error(f"Nitra: Failed to decode JWT token: {decode_error}")
-                return web.json_response(
+        if not user_email:
+            # Fall back to the email claim in the JWT (decoded once per token, then cached)
+            if access_token.count('.') != 2:
+                return _json_response(
+                    {"error": "Invalid token format"}, 
+                    status=401
+                )
+            user_email = _email_from_jwt(access_token)
+            if user_email is None:
+                return _json_response(
                     {"error": "Invalid token"}, 
                     status=401
                 )
         
         # Check if there's an active update for this user
-        if user_email in nitra_active_updates:
-            update_info = nitra_active_updates[user_email]
+        update_info = nitra_active_updates.get(user_email)
+        if update_info is not None:
             # Use debug level to avoid spamming terminal during polling
             logger.debug(f"Nitra: Update status for {user_email}: {update_info}")
-            return web.json_response(update_info)
+            return _json_response(update_info)
         else:
             # No active update found
-            return web.json_response({
+            return _json_response({
                 "status": "none",
                 "message": "No active update found"
             })
         
     except Exception as e:
         logger.error(f"Nitra: Update status check error: {e}")
-        return web.json_response(
+        return _json_response(
             {"error": "Internal server error"}, 
             status=500
         )
 
 @routes.get('/nitra/workflows')
+@require_bearer
 async def get_workflows(request):
     """Get all active workflows from admin subdomain"""
     try:
-        # Basic auth check
-        auth_header = request.headers.get('Authorization', '')
-        if not auth_header.startswith('Bearer '):
-            return web.json_response(
-                {"error": "Missing or invalid authorization header"}, 
-                status=401
-            )
-        
-        access_token = auth_header[7:]  # Remove 'Bearer ' prefix
-        
-        if not access_token:
-            return web.json_response(
-                {"error": "Missing access token"}, 
-                status=401
-            )
+        access_token = request['access_token']
         
         # Get user email from query parameter or decode from JWT token
         user_email = request.query.get('userEmail', '')
         
         if not user_email:
-            # Try to decode JWT token to extract user email as fallback
-            try:
-                import base64
-                import json as json_lib
-                
-                token_parts = access_token.split('.')
-                if len(token_parts) != 3:
-                    return web.json_response(
-                        {"error": "Invalid token format"}, 
-                        status=401
-                    )
-                
-                payload_b64 = token_parts[1]
-                payload_b64 += '=' * (4 - len(payload_b64) % 4)
-                payload = json_lib.loads(base64.b64decode(payload_b64))
-                user_email = payload.get('email') or payload.get('user_email', '')
-                
-            except Exception as decode_error:
-                logger.error(f"Nitra: Failed to decode JWT token: {decode_error}")
-                return web.json_response(
+            # Fall back to the email claim in the JWT (decoded once per token, then cached)
+            if access_token.count('.') != 2:
+                return _json_response(
+                    {"error": "Invalid token format"}, 
+                    status=401
+                )
+            user_email = _email_from_jwt(access_token)
+            if user_email is None:
+                return _json_response(
                     {"error": "Invalid token"}, 
                     status=401
                 )
         
         # Call main website API to get workflows
-        import requests
         
         workflows_url = f'{WEBSITE_BASE_URL}/api/workflows'
         
         headers = _build_upstream_headers(access_token, user_email)
         
-        response = requests.get(
+        # Awaited on the shared aiohttp session so other routes keep running meanwhile
+        session = await _get_http_session()
+        async with session.get(
             workflows_url, 
             headers=headers, 
-            timeout=30
-        )
-        response.raise_for_status()
-        
-        workflows_data = response.json()
+            timeout=aiohttp.ClientTimeout(total=30)
+        ) as response:
+            response.raise_for_status()
+            workflows_data = await response.json(content_type=None, loads=_jloads)
         
-        return web.json_response(workflows_data)
+        return _json_response(workflows_data)
         
     except Exception as e:
         logger.error(f"Nitra: Workflows fetch error: {e}")
-        return web.json_response(
+        return _json_response(
             {"error": "Internal server error"}, 
             status=500
         )
 
 @routes.get('/nitra/models')
+@require_bearer
 async def get_models(request):
     """Get all active models from admin subdomain"""
     try:
-        # Basic auth check
-        auth_header = request.headers.get('Authorization', '')
-        if not auth_header.startswith('Bearer '):
-            return web.json_response(
-                {"error": "Missing or invalid authorization header"}, 
-                status=401
-            )
-        
-        access_token = auth_header[7:]  # Remove 'Bearer ' prefix
-        
-        if not access_token:
-            return web.json_response(
-                {"error": "Missing access token"}, 
-                status=401
-            )
+        access_token = request['access_token']
         
         # Get user email from query parameter or decode from JWT token
         user_email = request.query.get('userEmail', '')
         
         if not user_email:
-            # Try to decode JWT token to extract user email as fallback
-            try:
-                import base64
-                import json as json_lib
-                
-                token_parts = access_token.split('.')
-                if len(token_parts) != 3:
-                    return web.json_response(
-                        {"error": "Invalid token format"}, 
-                        status=401
-                    )
-                
-                payload_b64 = token_parts[1]
-                payload_b64 += '=' * (4 - len(payload_b64) % 4)
-                payload = json_lib.loads(base64.b64decode(payload_b64))
-                user_email = payload.get('email') or payload.get('user_email', '')
-                
-            except Exception as decode_error:
-                logger.error(f"Nitra: Failed to decode JWT token: {decode_error}")
-                return web.json_response(
+            # Fall back to the email claim in the JWT (decoded once per token, then cached)
+            if access_token.count('.') != 2:
+                return _json_response(
+                    {"error": "Invalid token format"}, 
+                    status=401
+                )
+            user_email = _email_from_jwt(access_token)
+            if user_email is None:
+                return _json_response(
                     {"error": "Invalid token"}, 
                     status=401
                 )
         
         # Call main website API to get models
-        import requests
         
         models_url = f'{WEBSITE_BASE_URL}/api/models'
         
         headers = _build_upstream_headers(access_token, user_email)
         
-        response = requests.get(
+        # Awaited on the shared aiohttp session so other routes keep running meanwhile
+        session = await _get_http_session()
+        async with session.get(
             models_url, 
             headers=headers, 
-            timeout=30
-        )
-        response.raise_for_status()
+            timeout=aiohttp.ClientTimeout(total=30)
+        ) as response:
+            response.raise_for_status()
+            models_data = await response.json(content_type=None, loads=_jloads)
         
-        models_data = response.json()
-        
-        return web.json_response(models_data)
+        return _json_response(models_data)
         
     except Exception as e:
         logger.error(f"Nitra: Models fetch error: {e}")
-        return web.json_response(
+        return _json_response(
             {"error": "Internal server error"}, 
             status=500
         )
 
 @routes.get('/nitra/custom-nodes')
+@require_bearer
 async def get_custom_nodes(request):
     """Get all active custom nodes from admin subdomain"""
     try:
-        # Basic auth check
-        auth_header = request.headers.get('Authorization', '')
-        if not auth_header.startswith('Bearer '):
-            return web.json_response(
-                {"error": "Missing or invalid authorization header"}, 
-                status=401
-            )
-        
-        access_token = auth_header[7:]  # Remove 'Bearer ' prefix
-        
-        if not access_token:
-            return web.json_response(
-                {"error": "Missing access token"}, 
-                status=401
-            )
+        access_token = request['access_token']
         
         # Get user email from query parameter or decode from JWT token
         user_email = request.query.get('userEmail', '')
         
         if not user_email:
-            # Try to decode JWT token to extract user email as fallback
-            try:
-                import base64
-                import json as json_lib
-                
-                token_parts = access_token.split('.')
-                if len(token_parts) != 3:
-                    return web.json_response(
-                        {"error": "Invalid token format"}, 
-                        status=401
-                    )
-                
-                payload_b64 = token_parts[1]
-                payload_b64 += '=' * (4 - len(payload_b64) % 4)
-                payload = json_lib.loads(base64.b64decode(payload_b64))
-                user_email = payload.get('email') or payload.get('user_email', '')
-                
-            except Exception as decode_error:
-                logger.error(f"Nitra: Failed to decode JWT token: {decode_error}")
-                return web.json_response(
+            # Fall back to the email claim in the JWT (decoded once per token, then cached)
+            if access_token.count('.') != 2:
+                return _json_response(
+                    {"error": "Invalid token format"}, 
+                    status=401
+                )
+            user_email = _email_from_jwt(access_token)
+            if user_email is None:
+                return _json_response(
                     {"error": "Invalid token"}, 
                     status=401
                 )
         
         # Call main website API to get custom nodes
-        import requests
         
         custom_nodes_url = f'{WEBSITE_BASE_URL}/api/custom-nodes'
         
         headers = _build_upstream_headers(access_token, user_email)
         
-        response = requests.get(
+        # Awaited on the shared aiohttp session so other routes keep running meanwhile
+        session = await _get_http_session()
+        async with session.get(
             custom_nodes_url, 
             headers=headers, 
-            timeout=30
-        )
-        response.raise_for_status()
-        
-        custom_nodes_data = response.json()
+            timeout=aiohttp.ClientTimeout(total=30)
+        ) as response:
+            response.raise_for_status()
+            custom_nodes_data = await response.json(content_type=None, loads=_jloads)
         
-        return web.json_response(custom_nodes_data)
+        return _json_response(custom_nodes_data)
         
     except Exception as e:
         logger.error(f"Nitra: Custom nodes fetch error: {e}")
-        return web.json_response(
+        return _json_response(
             {"error": "Internal server error"}, 
             status=500
         )
 
 @routes.get('/nitra/workflows/{workflow_id}')
+@require_bearer
 async def get_workflow_details(request):
     """Get specific workflow details including subgraphs and models"""
     try:
-        # Basic auth check
-        auth_header = request.headers.get('Authorization', '')
-        if not auth_header.startswith('Bearer '):
-            return web.json_response(
-                {"error": "Missing or invalid authorization header"}, 
-                status=401
-            )
-        
-        access_token = auth_header[7:]  # Remove 'Bearer ' prefix
-        
-        if not access_token:
-            return web.json_response(
-                {"error": "Missing access token"}, 
-                status=401
-            )
+        access_token = request['access_token']
         
         # Get workflow ID from URL path
         workflow_id = request.match_info.get('workflow_id')
         if not workflow_id:
-            return web.json_response(
+            return _json_response(
                 {"error": "Workflow ID required"}, 
                 status=400
             )
@@ -2176,51 +2527,40 @@ async def get_workflow_details(request):
         user_email = request.query.get('userEmail', '')
         
         if not user_email:
-            # Try to decode JWT token to extract user email as fallback
-            try:
-                import base64
-                import json as json_lib
-                
-                token_parts = access_token.split('.')
-                if len(token_parts) != 3:
-                    return web.json_response(
-                        {"error": "Invalid token format"}, 
-                        status=401
-                    )
-                
-                payload_b64 = token_parts[1]
-                payload_b64 += '=' * (4 - len(payload_b64) % 4)
-                payload = json_lib.loads(base64.b64decode(payload_b64))
-                user_email = payload.get('email') or payload.get('user_email', '')
-                
-            except Exception as decode_error:
-                logger.error(f"Nitra: Failed to decode JWT token: {decode_error}")
-                return web.json_response(
+            # Fall back to the email claim in the JWT (decoded once per token, then cached)
+            if access_token.count('.') != 2:
+                return _json_response(
+                    {"error": "Invalid token format"}, 
+                    status=401
+                )
+            user_email = _email_from_jwt(access_token)
+            if user_email is None:
+                return _json_response(
                     {"error": "Invalid token"}, 
                     status=401
                 )
         
         # Call main website API to get workflow details
-        import requests
         
         workflow_url = f'{WEBSITE_BASE_URL}/api/workflows/{workflow_id}'
         
         headers = _build_upstream_headers(access_token, user_email)
         
-        response = requests.get(
+        # Awaited on the shared aiohttp session so other routes keep running meanwhile
+        session = await _get_http_session()
+        async with session.get(
             workflow_url, 
             headers=headers, 
-            timeout=30
-        )
-        response.raise_for_status()
+            timeout=aiohttp.ClientTimeout(total=30)
+        ) as response:
+            response.raise_for_status()
+            workflow_data = await response.json(content_type=None, loads=_jloads)
         
-        workflow_data = response.json()
-        
-        return web.json_response(workflow_data)
+        return _json_response(workflow_data)
         
     except Exception as e:
         logger.error(f"Nitra: Workflow details fetch error: {e}")
-        return web.json_response(
+        return _json_response(
             {"error": "Internal server error"}, 
             status=500
         )
@@ -2229,34 +2569,32 @@ async def get_workflow_details(request):
 async def test_route(request):
     """Test route to verify server is working"""
     debug_log("Test route accessed")
-    return web.json_response({"status": "Nitra server is working", "message": "Routes are properly registered"})
+    return _json_response({"status": "Nitra server is working", "message": "Routes are properly registered"})
+
+def _install_base_env(comfyui_root: str) -> Dict[str, str]:
+    """Current environment plus the request-independent install variables."""
+    return {
+        **os.environ,
+        'NITRA_CONFIGS_URL': f'{WEBSITE_BASE_URL}/api',
+        'NITRA_WEBSITE_URL': WEBSITE_BASE_URL,
+        'COMFY_DIR': comfyui_root,
+        'VENV_DIR': os.path.join(comfyui_root, 'venv'),
+    }
+
 
 @routes.post('/nitra/install/workflow')
+@require_bearer
 async def install_workflow(request):
     """Install workflows with their dependencies"""
     try:
-        # Basic auth check
-        auth_header = request.headers.get('Authorization', '')
-        if not auth_header.startswith('Bearer '):
-            return web.json_response(
-                {"error": "Missing or invalid authorization header"}, 
-                status=401
-            )
-        
-        access_token = auth_header[7:]  # Remove 'Bearer ' prefix
-        
-        if not access_token:
-            return web.json_response(
-                {"error": "Missing access token"}, 
-                status=401
-            )
+        access_token = request['access_token']
         
         # Parse request data
-        data = await request.json()
+        data = _jloads(await request.read())
         workflow_ids = data.get('workflow_ids', [])
         
         if not workflow_ids:
-            return web.json_response(
+            return _json_response(
                 {"error": "Workflow IDs required"}, 
                 status=400
             )
@@ -2266,15 +2604,15 @@ async def install_workflow(request):
         user_email = data.get('user_email')
         
         if not user_id or not user_email:
-            return web.json_response(
+            return _json_response(
                 {"error": "User information required"}, 
                 status=400
             )
 
         try:
-            _require_device_registration_only(access_token, user_id, user_email)
+            await _require_device_registration_only(access_token, user_id, user_email)
         except DeviceVerificationError as exc:
-            return web.json_response({"error": str(exc)}, status=428)
+            return _json_response({"error": str(exc)}, status=428)
         
         # Get HuggingFace token if provided
         hf_token = data.get('hf_token', '')
@@ -2289,64 +2627,27 @@ async def install_workflow(request):
         }
         
         # Use the script runner system with queue for workflow downloads
-        # Build path to workflow_downloader.py (for queue system)
-        # Use __file__ to get the directory where this script is located
-        # This is more reliable than os.getcwd() for path detection
-        try:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            # Navigate up from custom_nodes/ComfyUI-Nitra/ to ComfyUI root
-            comfyui_root = os.path.dirname(os.path.dirname(script_dir))
-            
-            # Validate that we found a valid ComfyUI root
-            if not os.path.exists(os.path.join(comfyui_root, 'main.py')):
-                # Fall back to cwd-based detection
-                current_dir = os.getcwd()
-                comfyui_root = current_dir
-                
-                if not os.path.exists(os.path.join(current_dir, 'main.py')):
-                    # Walk up to find ComfyUI root
-                    search_dir = current_dir
-                    for i in range(5):
-                        parent_dir = os.path.dirname(search_dir)
-                        if parent_dir == search_dir:
-                            break
-                        parent_main = os.path.join(parent_dir, 'main.py')
-                        if os.path.exists(parent_main):
-                            comfyui_root = parent_dir
-                            break
-                        search_dir = parent_dir
-        except Exception as e:
-            comfyui_root = os.getcwd()
+        # Build path to workflow_downloader.py (for queue system); the root is discovered once per process
+        comfyui_root, nitra_dir = _discover_comfyui_root()[:2]
         
         # Prepare environment variables
-        env = os.environ.copy()
-        env.update({
+        env = {
+            **_install_base_env(comfyui_root),
             'NITRA_USER_ID': user_id,
             'NITRA_USER_EMAIL': user_email,
             'NITRA_ACCESS_TOKEN': access_token,
-            'NITRA_UPDATE_OPTIONS': json.dumps(options),
-            'NITRA_CONFIGS_URL': f'{WEBSITE_BASE_URL}/api',
-            'COMFY_DIR': comfyui_root,
-            'VENV_DIR': os.path.join(comfyui_root, 'venv')
-        })
-        device_token, fingerprint_hash = _get_device_context()
-        if device_token:
-            env['NITRA_DEVICE_TOKEN'] = device_token
-        if fingerprint_hash:
-            env['NITRA_DEVICE_FINGERPRINT'] = fingerprint_hash
-        env['NITRA_WEBSITE_URL'] = WEBSITE_BASE_URL
+            'NITRA_UPDATE_OPTIONS': _jdumps(options),
+        }
         device_token, fingerprint_hash = _get_device_context()
         if device_token:
             env['NITRA_DEVICE_TOKEN'] = device_token
         if fingerprint_hash:
             env['NITRA_DEVICE_FINGERPRINT'] = fingerprint_hash
-        env['NITRA_WEBSITE_URL'] = WEBSITE_BASE_URL
         
         # Build command for fallback (only used if USE_LOCAL_SCRIPTS is True)
         # If USE_LOCAL_SCRIPTS is False, execute_workflow_task will download scripts to temp directory
-        nitra_dir = os.path.join(comfyui_root, 'custom_nodes', 'ComfyUI-Nitra', 'web')
         script_path = os.path.join(nitra_dir, 'workflow_downloader.py')
-        cmd = get_python_cmd() + [script_path, json.dumps(workflow_ids)]
+        cmd = [*get_python_cmd(), script_path, _jdumps(workflow_ids)]
         if hf_token:
             cmd.append(hf_token)
         
@@ -2363,17 +2664,10 @@ async def install_workflow(request):
             'hf_token': hf_token
         }
         
-        task_queue.put(('workflow', task_data))
-        
-        # Start worker thread if not already running
-        global task_worker_thread
-        if task_worker_thread is None or not task_worker_thread.is_alive():
-            task_worker_thread = threading.Thread(target=task_worker)
-            task_worker_thread.daemon = True
-            task_worker_thread.start()
+        enqueue_task('workflow', task_data, coalesce_key='workflow_ids')
         
         # Return immediately - don't wait for completion
-        return web.json_response({
+        return _json_response({
             "status": "started",
             "message": f"Workflow installation started for {len(workflow_ids)} workflows",
             "workflow_ids": workflow_ids
@@ -2381,37 +2675,24 @@ async def install_workflow(request):
             
     except Exception as e:
         logger.error(f"Nitra: Workflow installation error: {e}")
-        return web.json_response(
+        return _json_response(
             {"error": f"Failed to install workflows: {str(e)}"}, 
             status=500
         )
 
 @routes.post('/nitra/install/models')
+@require_bearer
 async def install_models(request):
     """Install selected models"""
     try:
-        # Basic auth check
-        auth_header = request.headers.get('Authorization', '')
-        if not auth_header.startswith('Bearer '):
-            return web.json_response(
-                {"error": "Missing or invalid authorization header"}, 
-                status=401
-            )
-        
-        access_token = auth_header[7:]  # Remove 'Bearer ' prefix
-        
-        if not access_token:
-            return web.json_response(
-                {"error": "Missing access token"}, 
-                status=401
-            )
+        access_token = request['access_token']
         
         # Parse request data
-        data = await request.json()
+        data = _jloads(await request.read())
         model_ids = data.get('model_ids', [])
         
         if not model_ids:
-            return web.json_response(
+            return _json_response(
                 {"error": "Model IDs required"}, 
                 status=400
             )
@@ -2421,7 +2702,7 @@ async def install_models(request):
         user_email = data.get('user_email')
         
         if not user_id or not user_email:
-            return web.json_response(
+            return _json_response(
                 {"error": "User information required"}, 
                 status=400
             )
@@ -2439,52 +2720,21 @@ async def install_models(request):
         
         # Use the script runner system with queue for model downloads
         
-        # Build path to model_downloads.py (for queue system)
-        # Use __file__ to get the directory where this script is located
-        # This is more reliable than os.getcwd() for path detection
-        try:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            # Navigate up from custom_nodes/ComfyUI-Nitra/ to ComfyUI root
-            comfyui_root = os.path.dirname(os.path.dirname(script_dir))
-            
-            # Validate that we found a valid ComfyUI root
-            if not os.path.exists(os.path.join(comfyui_root, 'main.py')):
-                # Fall back to cwd-based detection
-                current_dir = os.getcwd()
-                comfyui_root = current_dir
-                
-                if not os.path.exists(os.path.join(current_dir, 'main.py')):
-                    # Walk up to find ComfyUI root
-                    search_dir = current_dir
-                    for i in range(5):
-                        parent_dir = os.path.dirname(search_dir)
-                        if parent_dir == search_dir:
-                            break
-                        parent_main = os.path.join(parent_dir, 'main.py')
-                        if os.path.exists(parent_main):
-                            comfyui_root = parent_dir
-                            break
-                        search_dir = parent_dir
-        except Exception as e:
-            comfyui_root = os.getcwd()
-        
-        nitra_dir = os.path.join(comfyui_root, 'custom_nodes', 'ComfyUI-Nitra', 'web')
+        # Build path to model_downloads.py (for queue system); the root is discovered once per process
+        comfyui_root, nitra_dir = _discover_comfyui_root()[:2]
         script_path = os.path.join(nitra_dir, 'model_downloads.py')
         
         # Prepare environment variables
-        env = os.environ.copy()
-        env.update({
+        env = {
+            **_install_base_env(comfyui_root),
             'NITRA_USER_ID': user_id,
             'NITRA_USER_EMAIL': user_email,
             'NITRA_ACCESS_TOKEN': access_token,
-            'NITRA_UPDATE_OPTIONS': json.dumps(options),
-            'NITRA_CONFIGS_URL': f'{WEBSITE_BASE_URL}/api',
-            'COMFY_DIR': comfyui_root,
-            'VENV_DIR': os.path.join(comfyui_root, 'venv')
-        })
+            'NITRA_UPDATE_OPTIONS': _jdumps(options),
+        }
         
         # Execute the script with model IDs and HuggingFace token as arguments
-        cmd = get_python_cmd() + [script_path, json.dumps(model_ids)]
+        cmd = [*get_python_cmd(), script_path, _jdumps(model_ids)]
         if hf_token:
             cmd.append(hf_token)
         
@@ -2501,17 +2751,10 @@ async def install_models(request):
             'hf_token': hf_token
         }
         
-        task_queue.put(('model', task_data))
-        
-        # Start worker thread if not already running
-        global task_worker_thread
-        if task_worker_thread is None or not task_worker_thread.is_alive():
-            task_worker_thread = threading.Thread(target=task_worker)
-            task_worker_thread.daemon = True
-            task_worker_thread.start()
+        enqueue_task('model', task_data, coalesce_key='model_ids')
         
         # Return immediately - don't wait for completion
-        return web.json_response({
+        return _json_response({
             "status": "started",
             "message": f"Model installation started for {len(model_ids)} models",
             "model_ids": model_ids
@@ -2519,61 +2762,99 @@ async def install_models(request):
             
     except Exception as e:
         logger.error(f"Nitra: Model installation error: {e}")
-        return web.json_response(
+        return _json_response(
             {"error": f"Failed to install models: {str(e)}"}, 
             status=500
         )
 
 
+_MODEL_FILE_EXTS = ('.safetensors', '.ckpt', '.pt', '.pth', '.bin', '.gguf')
+# Names to ignore (common HF shard/config names that aren't helpful for matching); lowercase
+_MODEL_SKIP_NAMES = frozenset({
+    'diffusion_pytorch_model',
+    'pytorch_model',
+    'model',
+    'model-00001-of-00002',
+    'model-00002-of-00002'
+})
+
+
+def _scan_existing_models(models_dir: str) -> Tuple[List[str], List[str]]:
+    """Return (model basenames, file names) of model files anywhere under models_dir."""
+    existing_models = []
+    existing_files = []
+    skip_names = _MODEL_SKIP_NAMES
+    model_exts = _MODEL_FILE_EXTS
+    
+    # Walk through all subdirectories in models folder. scandir's DirEntry carries the
+    # file type from the directory read, so unlike os.walk no per-entry stat is needed
+    stack = [models_dir]
+    while stack:
+        try:
+            scanner = os.scandir(stack.pop())
+        except OSError:
+            # Missing/unreadable directories are skipped, as os.walk does
+            continue
+        with scanner:
+            for entry in scanner:
+                name = entry.name
+                try:
+                    if entry.is_dir():
+                        # Like os.walk, symlinked directories are not descended into
+                        if not entry.is_symlink():
+                            stack.append(entry.path)
+                        continue
+                except OSError:
+                    continue
+                # Check if it's a model file
+                if name.endswith(model_exts):
+                    basename = name.rsplit('.', 1)[0]
+                    if basename.lower() in skip_names:
+                        continue
+                    existing_models.append(basename)
+                    existing_files.append(name)
+    return existing_models, existing_files
+
+
+# (custom_nodes dir, its mtime_ns) -> scan result; installing/removing a package changes the mtime
+_installed_nodes_cache: Optional[Tuple[Tuple[str, int], List[str]]] = None
+
+
+def _scan_installed_nodes(custom_nodes_dir: str) -> List[str]:
+    """Return the lowercased directory names of installed custom node packages."""
+    global _installed_nodes_cache
+    try:
+        signature = (custom_nodes_dir, os.stat(custom_nodes_dir).st_mtime_ns)
+    except OSError:
+        return []
+    cached = _installed_nodes_cache
+    if cached is not None and cached[0] == signature:
+        return list(cached[1])
+    
+    # Get all directories in custom_nodes folder; DirEntry.is_dir() only stats symlinks
+    # (symlinked packages still count, as they did with os.path.isdir)
+    with os.scandir(custom_nodes_dir) as entries:
+        installed_nodes = [
+            entry.name.lower()  # Lowercase for easier matching
+            for entry in entries
+            if not entry.name.startswith('.') and entry.is_dir()
+        ]
+    _installed_nodes_cache = (signature, installed_nodes)
+    return list(installed_nodes)
+
+
 @routes.get('/nitra/models/check-existing')
-def check_existing_models(request):
+@require_bearer
+async def check_existing_models(request):
     """Check what models are already installed in ComfyUI"""
     try:
-        # Basic auth check
-        auth_header = request.headers.get('Authorization', '')
-        if not auth_header.startswith('Bearer '):
-            return web.json_response(
-                {"error": "Missing or invalid authorization header"}, 
-                status=401
-            )
-        
-        access_token = auth_header[7:]  # Remove 'Bearer ' prefix
-        
-        if not access_token:
-            return web.json_response(
-                {"error": "Missing access token"}, 
-                status=401
-            )
+        # Determine ComfyUI root directory (the token is only required, not used, by require_bearer)
+        models_dir = os.path.join(_discover_comfyui_root()[0], 'models')
         
-        # Determine ComfyUI root directory
-        comfyui_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        models_dir = os.path.join(comfyui_root, 'models')
+        # Walking a large models tree takes a while; keep the event loop free meanwhile
+        existing_models, existing_files = await asyncio.to_thread(_scan_existing_models, models_dir)
         
-        existing_models = []
-        existing_files = []
-
-        # Names to ignore (common HF shard/config names that aren't helpful for matching)
-        skip_names = {
-            'diffusion_pytorch_model',
-            'pytorch_model',
-            'model',
-            'model-00001-of-00002',
-            'model-00002-of-00002'
-        }
-        
-        if os.path.exists(models_dir):
-            # Walk through all subdirectories in models folder
-            for root, dirs, files in os.walk(models_dir):
-                for file in files:
-                    # Check if it's a model file
-                    if file.endswith(('.safetensors', '.ckpt', '.pt', '.pth', '.bin', '.gguf')):
-                        basename = os.path.splitext(file)[0]
-                        if basename.lower() in skip_names:
-                            continue
-                        existing_models.append(basename)
-                        existing_files.append(file)
-        
-        return web.json_response({
+        return _json_response({
             'existingModels': existing_models,
             'existingFiles': existing_files,
             'count': len(existing_models)
@@ -2581,48 +2862,37 @@ def check_existing_models(request):
         
     except Exception as e:
         print(f"Error checking existing models: {e}")
-        return web.json_response({'error': 'Failed to check existing models'}, status=500)
+        return _json_response({'error': 'Failed to check existing models'}, status=500)
 
 
 @routes.get('/nitra/custom-nodes/check-installed')
-def check_installed_custom_nodes(request):
+@require_bearer(allow_empty=True)
+async def check_installed_custom_nodes(request):
     """Check what custom nodes are already installed in ComfyUI"""
     try:
-        # Basic auth check
-        auth_header = request.headers.get('Authorization', '')
-        if not auth_header.startswith('Bearer '):
-            return web.json_response(
-                {"error": "Missing or invalid authorization header"}, 
-                status=401
-            )
-        
         # Determine ComfyUI custom_nodes directory
-        comfyui_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        custom_nodes_dir = os.path.join(comfyui_root, 'custom_nodes')
+        custom_nodes_dir = os.path.join(_discover_comfyui_root()[0], 'custom_nodes')
         
-        installed_nodes = []
+        installed_nodes = await asyncio.to_thread(_scan_installed_nodes, custom_nodes_dir)
         
-        if os.path.exists(custom_nodes_dir):
-            # Get all directories in custom_nodes folder
-            for item in os.listdir(custom_nodes_dir):
-                item_path = os.path.join(custom_nodes_dir, item)
-                if os.path.isdir(item_path) and not item.startswith('.'):
-                    # This is an installed custom node package
-                    installed_nodes.append(item.lower())  # Lowercase for easier matching
-        
-        return web.json_response({
+        return _json_response({
             'installedNodes': installed_nodes,
             'count': len(installed_nodes)
         })
         
     except Exception as e:
         print(f"Error checking installed custom nodes: {e}")
-        return web.json_response({'error': 'Failed to check installed custom nodes'}, status=500)
+        return _json_response({'error': 'Failed to check installed custom nodes'}, status=500)
 
 
-@routes.get('/nitra/check-nitra-updates')
-async def check_nitra_updates(request):
-    """Check if the current branch is behind its upstream and return update availability."""
+# The update check runs `git fetch`; the UI polls it, so answers are reused for a short while
+NITRA_UPDATE_CHECK_TTL_SECONDS = 30.0
+_nitra_update_check_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+_nitra_update_check_lock: Optional[asyncio.Lock] = None
+
+
+async def _compute_nitra_update_status() -> Tuple[Dict[str, Any], int]:
+    """Check if the current branch is behind its upstream; returns (payload, http status)."""
     try:
         nitra_dir = os.path.dirname(os.path.abspath(__file__))
         branch = get_git_branch()
@@ -2630,15 +2900,13 @@ async def check_nitra_updates(request):
         # Determine upstream reference (fallback to origin/{branch} if not set)
         upstream_ref = None
         try:
-            upstream_result = subprocess.run(
+            upstream_rc, upstream_out, _ = await _run_tool(
                 ['git', 'rev-parse', '--abbrev-ref', '--symbolic-full-name', '@{u}'],
+                timeout=5,
                 cwd=nitra_dir,
-                capture_output=True,
-                text=True,
-                timeout=5
             )
-            if upstream_result.returncode == 0:
-                upstream_ref = upstream_result.stdout.strip()
+            if upstream_rc == 0:
+                upstream_ref = upstream_out.strip()
         except Exception as upstream_error:
             logger.debug(f"Nitra: Unable to determine upstream via @{{u}}: {upstream_error}")
 
@@ -2647,70 +2915,78 @@ async def check_nitra_updates(request):
 
         # Fetch latest refs from remote; continue even if fetch fails (use last known state)
         try:
-            fetch_result = subprocess.run(
-                ['git', 'fetch', 'origin'],
-                cwd=nitra_dir,
-                capture_output=True,
-                text=True,
-                timeout=60
-            )
-            if fetch_result.returncode != 0:
-                logger.warning(f"Nitra: git fetch failed while checking updates: {fetch_result.stderr.strip()}")
+            # Awaited: a slow fetch (up to 60s) must not freeze the other routes
+            fetch_rc, _, fetch_err = await _run_tool(['git', 'fetch', 'origin'], timeout=60, cwd=nitra_dir)
+            if fetch_rc != 0:
+                logger.warning(f"Nitra: git fetch failed while checking updates: {fetch_err.strip()}")
         except Exception as fetch_error:
             logger.warning(f"Nitra: git fetch error while checking updates: {fetch_error}")
 
         # Compare commit counts between local HEAD and upstream
         rev_list_cmd = ['git', 'rev-list', '--left-right', '--count', f'HEAD...{upstream_ref}']
-        rev_list_result = subprocess.run(
-            rev_list_cmd,
-            cwd=nitra_dir,
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
+        rev_list_rc, rev_list_out, rev_list_err = await _run_tool(rev_list_cmd, timeout=10, cwd=nitra_dir)
 
-        if rev_list_result.returncode != 0:
-            error_msg = rev_list_result.stderr.strip() or "Unknown git error"
+        if rev_list_rc != 0:
+            error_msg = rev_list_err.strip() or "Unknown git error"
             logger.warning(f"Nitra: Failed to compare commits for update check: {error_msg}")
-            return web.json_response({
+            return {
                 'updatesAvailable': False,
                 'error': error_msg,
                 'branch': branch
-            }, status=200)
+            }, 200
 
-        counts = rev_list_result.stdout.strip().split()
+        counts = rev_list_out.strip().split()
         if len(counts) < 2:
             logger.warning("Nitra: Unexpected git rev-list output while checking updates")
-            return web.json_response({
+            return {
                 'updatesAvailable': False,
                 'error': 'Unexpected git output',
                 'branch': branch
-            }, status=200)
+            }, 200
 
         ahead_count = int(counts[0])
         behind_count = int(counts[1])
 
-        return web.json_response({
+        return {
             'updatesAvailable': behind_count > 0,
             'ahead': ahead_count,
             'behind': behind_count,
             'branch': branch,
             'upstream': upstream_ref
-        })
+        }, 200
     except Exception as e:
         logger.error(f"Nitra: Error checking Nitra updates: {e}")
-        return web.json_response(
-            {
-                'updatesAvailable': False,
-                'error': str(e),
-            },
-            status=500
-        )
+        return {
+            'updatesAvailable': False,
+            'error': str(e),
+        }, 500
+
+
+@routes.get('/nitra/check-nitra-updates')
+async def check_nitra_updates(request):
+    """Check if the current branch is behind its upstream and return update availability."""
+    global _nitra_update_check_cache, _nitra_update_check_lock
+    cached = _nitra_update_check_cache
+    if cached is not None and time.monotonic() - cached[0] < NITRA_UPDATE_CHECK_TTL_SECONDS:
+        return _json_response(cached[1])
+
+    if _nitra_update_check_lock is None:
+        _nitra_update_check_lock = asyncio.Lock()
+    # Concurrent polls wait for the one in-flight git fetch instead of starting their own
+    async with _nitra_update_check_lock:
+        cached = _nitra_update_check_cache
+        if cached is not None and time.monotonic() - cached[0] < NITRA_UPDATE_CHECK_TTL_SECONDS:
+            return _json_response(cached[1])
+        payload, status = await _compute_nitra_update_status()
+        if status == 200:
+            _nitra_update_check_cache = (time.monotonic(), payload)
+    return _json_response(payload, status=status)
 
 
 @routes.post('/nitra/update-nitra')
 async def update_nitra(request):
     """Update ComfyUI-Nitra by running git pull"""
+    global _nitra_update_check_cache
     try:
         debug_log("Update Nitra endpoint called")
 
@@ -2722,41 +2998,37 @@ async def update_nitra(request):
         # Run git pull
         try:
             debug_log("Running git pull...")
-            result = subprocess.run(
-                ['git', 'pull'],
-                cwd=nitra_dir,
-                capture_output=True,
-                text=True,
-                timeout=120
-            )
-            if result.returncode != 0:
-                logger.error(f"Git pull failed: {result.stderr}")
-                return web.json_response({
+            pull_rc, pull_out, pull_err = await _run_tool(['git', 'pull'], timeout=120, cwd=nitra_dir)
+            if pull_rc != 0:
+                logger.error(f"Git pull failed: {pull_err}")
+                return _json_response({
                     "success": False,
-                    "error": f"Git pull failed: {result.stderr}"
+                    "error": f"Git pull failed: {pull_err}"
                 }, status=500)
-            debug_log(f"Git pull output: {result.stdout}")
+            debug_log(f"Git pull output: {pull_out}")
+            # The cached "behind upstream" answer is stale once we have pulled
+            _nitra_update_check_cache = None
             
-            return web.json_response({
+            return _json_response({
                 "success": True,
                 "message": "Nitra updated successfully",
-                "output": result.stdout
+                "output": pull_out
             })
-        except subprocess.TimeoutExpired:
-            return web.json_response({
+        except (asyncio.TimeoutError, subprocess.TimeoutExpired):
+            return _json_response({
                 "success": False,
                 "error": "Git pull timed out after 2 minutes"
             }, status=500)
         except Exception as e:
             logger.error(f"Git pull error: {e}")
-            return web.json_response({
+            return _json_response({
                 "success": False,
                 "error": f"Git pull error: {str(e)}"
             }, status=500)
         
     except Exception as e:
         logger.error(f"Nitra: Update Nitra error: {e}")
-        return web.json_response(
+        return _json_response(
             {"success": False, "error": f"Failed to update Nitra: {str(e)}"}, 
             status=500
         )
@@ -2774,26 +3046,20 @@ async def update_comfyui(request):
         # Step 1: Run git pull
         try:
             debug_log("Running git pull...")
-            result = subprocess.run(
-                ['git', 'pull'],
-                cwd=comfyui_dir,
-                capture_output=True,
-                text=True,
-                timeout=120
-            )
-            if result.returncode != 0:
-                logger.error(f"Git pull failed: {result.stderr}")
-                return web.json_response({
-                    "error": f"Git pull failed: {result.stderr}"
+            pull_rc, pull_out, pull_err = await _run_tool(['git', 'pull'], timeout=120, cwd=comfyui_dir)
+            if pull_rc != 0:
+                logger.error(f"Git pull failed: {pull_err}")
+                return _json_response({
+                    "error": f"Git pull failed: {pull_err}"
                 }, status=500)
-            debug_log(f"Git pull output: {result.stdout}")
-        except subprocess.TimeoutExpired:
-            return web.json_response({
+            debug_log(f"Git pull output: {pull_out}")
+        except (asyncio.TimeoutError, subprocess.TimeoutExpired):
+            return _json_response({
                 "error": "Git pull timed out after 2 minutes"
             }, status=500)
         except Exception as e:
             logger.error(f"Git pull error: {e}")
-            return web.json_response({
+            return _json_response({
                 "error": f"Git pull error: {str(e)}"
             }, status=500)
         
@@ -2804,45 +3070,43 @@ async def update_comfyui(request):
         else:
             try:
                 debug_log("Installing requirements from requirements.txt...")
-                result = subprocess.run(
+                # Streamed into the pip log while it runs rather than buffered until exit
+                pip_rc, pip_tail = await _run_logged_pip(
                     [sys.executable, '-m', 'pip', 'install', '-r', requirements_path],
-                    capture_output=True,
-                    text=True,
-                    timeout=600
+                    "pip install -r requirements.txt output",
+                    timeout=600,
                 )
-                _log_pip_output("pip install -r requirements.txt stdout", result.stdout)
-                _log_pip_output("pip install -r requirements.txt stderr", result.stderr)
-                if result.returncode != 0:
-                    error_msg = result.stderr or "Unknown pip error"
+                if pip_rc != 0:
+                    error_msg = pip_tail or "Unknown pip error"
                     logger.error(f"Failed to install requirements: {error_msg}")
-                    return web.json_response({
+                    return _json_response({
                         "success": False,
                         "message": "requirements.txt installation failed",
                         "errors": [error_msg]
                     }, status=500)
-            except subprocess.TimeoutExpired:
+            except (asyncio.TimeoutError, subprocess.TimeoutExpired):
                 logger.error("requirements.txt installation timed out after 600 seconds")
                 _log_pip_output("pip install -r requirements.txt", "Command timed out after 600 seconds")
-                return web.json_response({
+                return _json_response({
                     "success": False,
                     "message": "requirements.txt installation timed out"
                 }, status=500)
             except Exception as e:
                 logger.error(f"Error installing requirements: {e}")
                 _log_pip_output("pip install -r requirements.txt error", str(e))
-                return web.json_response({
+                return _json_response({
                     "success": False,
                     "message": f"Error installing requirements: {str(e)}"
                 }, status=500)
         
-        return web.json_response({
+        return _json_response({
             "success": True,
             "message": "ComfyUI updated successfully"
         })
         
     except Exception as e:
         logger.error(f"Nitra: Update ComfyUI error: {e}")
-        return web.json_response(
+        return _json_response(
             {"error": f"Failed to update ComfyUI: {str(e)}"}, 
             status=500
         )
@@ -2872,7 +3136,6 @@ def _build_restart_command(sageattention_installed: bool) -> list[str]:
 
 def _spawn_restart_thread(cmds: list[str], exit_after: bool = False) -> None:
     """Spawn a daemon thread that restarts the current process after a short delay."""
-    import time
 
     def _do_restart():
         try:
@@ -2912,16 +3175,16 @@ def restart_comfyui(request):
                 pass
             logger.info("Nitra: CLI session restart requested, scheduling exit")
             _spawn_restart_thread([], exit_after=True)
-            return web.json_response({"success": True, "message": "Restarting ComfyUI (CLI session)"})
+            return _json_response({"success": True, "message": "Restarting ComfyUI (CLI session)"})
 
         logger.info("Nitra: Restarting ComfyUI [legacy mode]")
         cmds = _build_restart_command(sageattention_installed)
         _spawn_restart_thread(cmds)
-        return web.json_response({"success": True, "message": "Restart command accepted"})
+        return _json_response({"success": True, "message": "Restart command accepted"})
 
     except Exception as e:
         logger.error(f"Nitra: Restart error: {e}")
-        return web.json_response(
+        return _json_response(
             {"error": f"Failed to restart ComfyUI: {str(e)}"}, 
             status=500
         )
@@ -2929,11 +3192,6 @@ def restart_comfyui(request):
 @routes.get('/nitra/queue/reset')
 async def reset_queue(request):
     """Reset the task queue and kill running processes"""
-    global task_queue, tasks_in_progress, running_processes
-    
-    with task_worker_lock:
-        task_queue = queue.Queue()
-
     _cleanup_running_processes()
 
     return web.Response(status=200)
@@ -2941,17 +3199,15 @@ async def reset_queue(request):
 @routes.get('/nitra/queue/status')
 async def queue_status(request):
     """Get queue status (ComfyUI-Manager pattern)"""
-    global task_worker_thread
-    
-    with task_worker_lock:
-        in_progress_count = len(tasks_in_progress)
-        queue_size = task_queue.qsize()
-        is_processing = task_worker_thread is not None and task_worker_thread.is_alive()
-        running_count = len(running_processes)
+    in_progress_count = len(tasks_in_progress)
+    queue_size = _queued_task_count()
+    is_processing = in_progress_count > 0 or queue_size > 0
+    # Plain len() reads are atomic; polled every 2s per client, so no lock here
+    running_count = len(running_processes)
     
     # Queue status logging removed to avoid spam (called every 2 seconds by polling)
     
-    return web.json_response({
+    return _json_response({
         'queue_size': queue_size,
         'in_progress_count': in_progress_count,
         'is_processing': is_processing,
@@ -2960,66 +3216,55 @@ async def queue_status(request):
 
 
 @routes.post('/nitra/install/package')
+@require_bearer
 async def install_package(request):
     """Install package using category and config"""
     try:
-        _register_promptserver_shutdown()
-        
-        auth_header = request.headers.get('Authorization', '')
-        if not auth_header.startswith('Bearer '):
-            return web.json_response(
-                {"error": "Missing or invalid authorization header"}, 
-                status=401
-            )
+        _register_shutdown_handlers()
         
-        access_token = auth_header[7:]
+        access_token = request['access_token']
         
-        if not access_token:
-            return web.json_response(
-                {"error": "Missing access token"}, 
-                status=401
-            )
-        
-        data = await request.json()
+        data = _jloads(await request.read())
         category = data.get('category', '')
         config = data.get('config', {})
         user_id = data.get('user_id', '')
         user_email = data.get('user_email', '')
         
         if not category:
-            return web.json_response(
+            return _json_response(
                 {"error": "Missing category in request body"}, 
                 status=400
             )
         
         if not user_id:
-            return web.json_response(
+            return _json_response(
                 {"error": "Missing user_id in request body"}, 
                 status=400
             )
         if not user_email:
-            return web.json_response(
+            return _json_response(
                 {"error": "Missing user_email in request body"},
                 status=400,
             )
 
         try:
-            _require_device_registration_only(access_token, user_id, user_email)
+            await _require_device_registration_only(access_token, user_id, user_email)
         except DeviceVerificationError as exc:
-            return web.json_response({"error": str(exc)}, status=428)
+            return _json_response({"error": str(exc)}, status=428)
         
         debug_log(f"Installing {category} for user {user_id}")
         
-        web_dir = os.path.join(os.path.dirname(__file__), 'web')
+        web_dir = WEB_DIR
         installer_path = os.path.join(web_dir, 'package_installer.py')
         
         if not os.path.exists(installer_path):
-            return web.json_response(
+            return _json_response(
                 {"error": "Package installer not found"}, 
                 status=500
             )
         
-        cmd = get_python_cmd() + [
+        cmd = [
+            *get_python_cmd(),
             installer_path,
             category,
             json.dumps(config)
@@ -3061,12 +3306,12 @@ async def install_package(request):
         with task_worker_lock:
             running_processes[task_id] = {
                 'process': process,
-                'stdout_thread': None,
-                'stderr_thread': None,
                 'type': 'package'
             }
         try:
-            _, stderr_output = process.communicate()
+            # The install can take minutes; wait in a worker thread so the loop keeps serving
+            # status polls and cancel requests (which terminate the Popen tracked above)
+            _, stderr_output = await asyncio.to_thread(process.communicate)
         finally:
             with task_worker_lock:
                 running_processes.pop(task_id, None)
@@ -3075,31 +3320,33 @@ async def install_package(request):
         try:
             json_result = None
             if stderr_output:
-                # Try to find the JSON result in stderr (last valid JSON line)
-                for line in stderr_output.strip().split('\n'):
+                # The result is the last valid JSON line, so scan from the end and stop at the
+                # first hit instead of parsing every earlier progress line
+                for line in reversed(stderr_output.splitlines()):
                     line = line.strip()
-                    if line and line.startswith('{'):
+                    if line.startswith('{'):
                         try:
-                            json_result = json.loads(line)
-                        except:
+                            json_result = _jloads(line)
+                        except ValueError:  # json/orjson JSONDecodeError
                             continue
+                        break
             
             if not json_result:
                 logger.error(f"No JSON result found in stderr. Output: {stderr_output}")
-                return web.json_response({
+                return _json_response({
                     "status": "failed",
                     "message": "No result from installer"
                 }, status=500)
             
             # Check if installation was successful based on JSON result
             if json_result.get('success'):
-                return web.json_response({
+                return _json_response({
                     "status": "success",
                     "message": json_result.get('message', 'Installation completed'),
                     "details": json_result
                 })
             else:
-                return web.json_response({
+                return _json_response({
                     "status": "failed",
                     "message": json_result.get('error', 'Installation failed'),
                     "details": json_result
@@ -3107,14 +3354,14 @@ async def install_package(request):
                 
         except Exception as e:
             logger.error(f"Failed to parse installer output: {e}. stderr: {stderr_output}")
-            return web.json_response({
+            return _json_response({
                 "status": "failed",
                 "message": f"Failed to parse installer output: {str(e)}"
             }, status=500)
             
     except Exception as e:
         logger.error(f"Nitra: Package installation error: {e}")
-        return web.json_response(
+        return _json_response(
             {"error": f"Failed to install package: {str(e)}"}, 
             status=500
         )
@@ -3125,7 +3372,7 @@ async def install_package(request):
 async def proxy_contact(request):
     """Proxy contact form submission to WEBSITE_BASE_URL/api/contact"""
     try:
-        data = await request.json()
+        data = _jloads(await request.read())
         name = data.get('name', '')
         email = data.get('email', '')
         phone = data.get('phone', '')
@@ -3135,16 +3382,16 @@ async def proxy_contact(request):
 
         # Basic validation (fail fast)
         if not name or not email or not message:
-            return web.json_response({
+            return _json_response({
                 'error': 'Missing required fields'
             }, status=400)
 
-        import requests
         url = f"{WEBSITE_BASE_URL}/api/contact"
-        resp = requests.post(
+        session = await _get_http_session()
+        async with session.post(
             url,
             headers={'Content-Type': 'application/json'},
-            timeout=30,
+            timeout=aiohttp.ClientTimeout(total=30),
             json={
                 'name': name,
                 'email': email,
@@ -3153,28 +3400,28 @@ async def proxy_contact(request):
                 'message': message,
                 'subscribeToNewsletter': subscribe
             }
-        )
-
-        if resp.ok:
-            try:
-                body = resp.json()
-            except Exception:
-                body = {'ok': True}
-            return web.json_response(body)
-        else:
-            return web.json_response({'error': 'Upstream contact failed'}, status=resp.status_code)
+        ) as resp:
+            if resp.ok:
+                try:
+                    body = await resp.json(content_type=None, loads=_jloads)
+                except Exception:
+                    body = {'ok': True}
+                return _json_response(body)
+            else:
+                return _json_response({'error': 'Upstream contact failed'}, status=resp.status)
 
     except Exception as e:
         logger.error(f"Nitra: Contact proxy error: {e}")
-        return web.json_response({'error': 'Internal server error'}, status=500)
+        return _json_response({'error': 'Internal server error'}, status=500)
 
 
 # User configuration (TOML) stored in ComfyUI/user/nitra/config.toml
+@functools.lru_cache(maxsize=1)
 def _get_comfy_root_from_here():
     try:
         script_dir = os.path.dirname(os.path.abspath(__file__))
         return os.path.dirname(os.path.dirname(script_dir))
-    except Exception:
+    except OSError:  # abspath() needs the cwd, which may have been removed
         return os.getcwd()
 
 
@@ -3188,10 +3435,9 @@ def _get_user_config_path():
 def _read_toml_safe(path):
     try:
         # Prefer tomllib (Py>=3.11)
-        import importlib
         try:
             tomllib = importlib.import_module('tomllib')
-        except Exception:
+        except ImportError:
             tomllib = None
         if tomllib:
             with open(path, 'rb') as f:
@@ -3201,7 +3447,7 @@ def _read_toml_safe(path):
             toml = importlib.import_module('toml')
             with open(path, 'r', encoding='utf-8') as f:
                 return toml.load(f)
-        except Exception:
+        except (ImportError, ValueError):  # not installed, or TomlDecodeError
             pass
         # Minimal manual parse for our simple keys
         data = {'extra_model_paths': [], 'huggingface_token': ''}
@@ -3223,15 +3469,18 @@ def _read_toml_safe(path):
                         items = [s.strip().strip('"') for s in inner.split(',') if s.strip()]
                         data['extra_model_paths'] = items
         return data
-    except Exception as e:
+    except (OSError, ValueError) as e:  # ValueError covers TOMLDecodeError and UnicodeDecodeError
         logger.error(f"Failed to read TOML: {e}")
         return {'extra_model_paths': [], 'huggingface_token': ''}
 
 
+# Quote escaping for the hand-written TOML fallback (matches what _read_toml_safe strips)
+_TOML_QUOTE_ESC = str.maketrans({'"': '\\"'})
+
+
 def _write_toml_safe(path, data):
     try:
         # Try toml package first for writing
-        import importlib
         try:
             toml = importlib.import_module('toml')
             with open(path, 'w', encoding='utf-8') as f:
@@ -3240,16 +3489,18 @@ def _write_toml_safe(path, data):
         except Exception:
             pass
         # Manual write minimal TOML
-        lines = []
         hf = data.get('huggingface_token', '') or ''
         paths = data.get('extra_model_paths', []) or []
-        # Escape quotes in values
-        hf_escaped = hf.replace('"', '\\"')
-        lines.append(f'huggingface_token = "{hf_escaped}"')
-        quoted_paths = ", ".join([f'"{str(p).replace("\"", "\\\"")}"' for p in paths])
-        lines.append(f'extra_model_paths = [{quoted_paths}]')
+        buf = io.StringIO()
+        buf.write(f'huggingface_token = "{hf.translate(_TOML_QUOTE_ESC)}"\n')
+        buf.write('extra_model_paths = [')
+        for i, p in enumerate(paths):
+            if i:
+                buf.write(', ')
+            buf.write(f'"{str(p).translate(_TOML_QUOTE_ESC)}"')
+        buf.write(']\n')
         with open(path, 'w', encoding='utf-8') as f:
-            f.write("\n".join(lines) + "\n")
+            f.write(buf.getvalue())
         return True
     except Exception as e:
         logger.error(f"Failed to write TOML: {e}")
@@ -3306,25 +3557,38 @@ def _format_relative_model_subdir(folder_name: str) -> str:
     return path
 
 
+def _render_yaml_folder_entry(name: str, mapping: Union[str, List[str]]) -> str:
+    """Render one `comfyui:` folder entry; list mappings become a block scalar."""
+    if isinstance(mapping, list):
+        return "\n".join([f"     {name}: |", *(f"          {value_line}" for value_line in mapping)])
+    return f"     {name}: {mapping}"
+
+
+# The default folder block never changes, so it is rendered once at import
+_STATIC_ENTRY_LINES = "\n".join(
+    _render_yaml_folder_entry(name, mapping) for name, mapping in DEFAULT_COMFY_FOLDER_ENTRIES
+)
+_DEFAULT_FOLDER_KEYS = frozenset(name.lower() for name, _ in DEFAULT_COMFY_FOLDER_ENTRIES)
+_YAML_HEADER_TEMPLATE = "\n".join([
+    "#Rename this to extra_model_paths.yaml and ComfyUI will load it",
+    "",
+    "#config for comfyui",
+    "#your base path should be either an existing comfy install or a central folder where you store all of your models, loras, etc.",
+    "",
+    "comfyui:",
+    "     base_path: {base_path}",
+    "     # You can use is_default to mark that these folders should be listed first, and used as the default dirs for eg downloads",
+    "     #is_default: true",
+])
+
+
 def _generate_extra_model_paths_yaml(base_path: str, detected_folders: Optional[List[str]] = None):
     """
     Generate extra_model_paths.yaml content infused with detected install folders.
     """
     detected_folders = detected_folders or []
-    lines: List[str] = [
-        "#Rename this to extra_model_paths.yaml and ComfyUI will load it",
-        "",
-        "#config for comfyui",
-        "#your base path should be either an existing comfy install or a central folder where you store all of your models, loras, etc.",
-        "",
-        "comfyui:",
-        f"     base_path: {base_path}",
-        "     # You can use is_default to mark that these folders should be listed first, and used as the default dirs for eg downloads",
-        "     #is_default: true",
-    ]
-
-    entries: List[Tuple[str, Union[str, List[str]]]] = list(DEFAULT_COMFY_FOLDER_ENTRIES)
-    seen_keys = {name.lower() for name, _ in entries}
+    lines: List[str] = [_YAML_HEADER_TEMPLATE.format(base_path=base_path)]
+    seen_keys = set(_DEFAULT_FOLDER_KEYS)
 
     dynamic_entries: List[Tuple[str, str]] = []
     for raw_folder in detected_folders:
@@ -3340,15 +3604,8 @@ def _generate_extra_model_paths_yaml(base_path: str, detected_folders: Optional[
     if dynamic_entries:
         lines.append("     # Additional install folders detected from your Nitra models")
 
-    entries.extend(dynamic_entries)
-
-    for name, mapping in entries:
-        if isinstance(mapping, list):
-            lines.append(f"     {name}: |")
-            for value_line in mapping:
-                lines.append(f"          {value_line}")
-        else:
-            lines.append(f"     {name}: {mapping}")
+    lines.append(_STATIC_ENTRY_LINES)
+    lines.extend(_render_yaml_folder_entry(name, mapping) for name, mapping in dynamic_entries)
 
     lines.append("")
     return "\n".join(lines)
@@ -3418,6 +3675,9 @@ def _get_legacy_device_state_path():
 
 def _get_device_state_path():
     """Return path to device state file in the common user directory."""
+    global _device_state_path
+    if _device_state_path is not None:
+        return _device_state_path
     nitra_dir = _get_common_nitra_dir()
     os.makedirs(nitra_dir, exist_ok=True)
     common_path = os.path.join(nitra_dir, 'device_state.json')
@@ -3427,23 +3687,35 @@ def _get_device_state_path():
         legacy_path = _get_legacy_device_state_path()
         if os.path.exists(legacy_path):
             try:
-                import shutil
                 shutil.copy2(legacy_path, common_path)
                 logger.info(f"Nitra: Migrated device state from {legacy_path} to {common_path}")
             except Exception as e:
                 logger.warning(f"Nitra: Failed to migrate device state: {e}")
 
+    # Directory created and legacy state migrated; later calls reuse the path as-is
+    _device_state_path = common_path
     return common_path
 
 
 def _read_device_state() -> Dict[str, Any]:
+    global _device_state_cache
     path = _get_device_state_path()
-    if not os.path.exists(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
         return {}
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _device_state_cache
+    if cached is not None and cached[0] == signature:
+        # Callers may modify the state before writing it back, so hand out a copy
+        return dict(cached[1])
     try:
-        with open(path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        return data if isinstance(data, dict) else {}
+        with open(path, 'rb') as f:
+            data = _jloads(f.read())
+        if not isinstance(data, dict):
+            return {}
+        _device_state_cache = (signature, data)
+        return dict(data)
     except Exception as e:
         logger.warning(f"Nitra: Failed to read device state: {e}")
         return {}
@@ -3452,7 +3724,9 @@ def _read_device_state() -> Dict[str, Any]:
 def _write_device_state(data: Optional[Dict[str, Any]]):
     """Persist device metadata (token stored securely via keyring)."""
     path = _get_device_state_path()
-    global _cached_device_token
+    global _cached_device_token, _device_state_cache, _device_context_cache, _device_state_path
+    _device_state_cache = None
+    _device_context_cache = None
     if not data:
         existing_state = _read_device_state()
         entry_id = _get_secure_entry_id(existing_state)
@@ -3464,6 +3738,8 @@ def _write_device_state(data: Optional[Dict[str, Any]]):
                 os.remove(path)
             except Exception as e:
                 logger.warning(f"Nitra: Failed to delete device state file: {e}")
+        # Re-run the directory/migration checks on the next lookup, as before
+        _device_state_path = None
         return
 
     sanitized = dict(data)
@@ -3473,6 +3749,9 @@ def _write_device_state(data: Optional[Dict[str, Any]]):
     try:
         with open(path, 'w', encoding='utf-8') as f:
             json.dump(sanitized, f, indent=2)
+        # Prime the cache with what was just written so the next read skips the re-parse
+        stat = os.stat(path)
+        _device_state_cache = ((stat.st_mtime_ns, stat.st_size), sanitized)
     except Exception as e:
         logger.error(f"Nitra: Failed to write device state: {e}")
 
@@ -3484,7 +3763,7 @@ def _get_secure_entry_id(state: Optional[Dict[str, Any]]) -> Optional[str]:
 
 
 def _delete_secure_device_token(entry_id: Optional[str]):
-    global _cached_device_token
+    global _cached_device_token, _device_context_cache
     if not entry_id:
         return
     if keyring:
@@ -3493,13 +3772,15 @@ def _delete_secure_device_token(entry_id: Optional[str]):
         except KeyringError:
             pass
     _cached_device_token = None
+    _device_context_cache = None
 
 
 def _store_device_token_secure(entry_id: Optional[str], token: Optional[str]) -> bool:
-    global _cached_device_token
+    global _cached_device_token, _device_context_cache
     if not token:
         return False
     _cached_device_token = token
+    _device_context_cache = None
     if not entry_id:
         logger.error("Nitra: Secure entry id missing; cannot persist device token.")
         return False
@@ -3555,13 +3836,36 @@ def _get_device_token():
 
 def _get_device_context() -> Tuple[Optional[str], Optional[str]]:
     """Return (device_token, fingerprint_hash) for downstream verification."""
+    global _device_context_cache
+    try:
+        stat = os.stat(_get_device_state_path())
+        signature: Optional[Tuple[int, int]] = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        signature = None
+    cached = _device_context_cache
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
     state = _read_device_state()
     fingerprint_hash = state.get('fingerprint_hash') if state else None
     token = _get_device_token()
-    return token, fingerprint_hash
-
-
-def _build_upstream_headers(access_token: Optional[str] = None, user_email: Optional[str] = None, user_id: Optional[str] = None, *, include_content_type: bool = True) -> Dict[str, str]:
+    context = (token, fingerprint_hash)
+    # A failed keyring lookup is not cached, so it is retried on the next call as before
+    if token is not None or not (keyring and _get_secure_entry_id(state)):
+        _device_context_cache = (signature, context)
+    return context
+
+
+@functools.lru_cache(maxsize=256)
+def _upstream_header_items(
+    access_token: Optional[str],
+    user_email: Optional[str],
+    user_id: Optional[str],
+    include_content_type: bool,
+    fingerprint_hash: Optional[str],
+    device_token: Optional[str],
+) -> Tuple[Tuple[str, str], ...]:
+    """Header pairs for one (user, device) combination; stable across polls, so cached."""
     headers: Dict[str, str] = {}
     if include_content_type:
         headers['Content-Type'] = 'application/json'
@@ -3571,14 +3875,19 @@ def _build_upstream_headers(access_token: Optional[str] = None, user_email: Opti
         headers['X-User-Email'] = user_email
     if user_id:
         headers['X-User-Id'] = user_id
-    device_state = _read_device_state()
-    fingerprint_hash = device_state.get('fingerprint_hash') if device_state else None
     if fingerprint_hash:
         headers['X-Device-Fingerprint'] = fingerprint_hash
-    device_token = _get_device_token()
     if device_token:
         headers['X-Device-Token'] = device_token
-    return headers
+    return tuple(headers.items())
+
+
+def _build_upstream_headers(access_token: Optional[str] = None, user_email: Optional[str] = None, user_id: Optional[str] = None, *, include_content_type: bool = True) -> Dict[str, str]:
+    # The device context is part of the cache key so re-registering a machine is picked up
+    device_token, fingerprint_hash = _get_device_context()
+    return dict(_upstream_header_items(
+        access_token, user_email, user_id, include_content_type, fingerprint_hash, device_token
+    ))
 
 
 class SubscriptionVerificationError(Exception):
@@ -3589,31 +3898,45 @@ class DeviceVerificationError(Exception):
     """Raised when device verification fails."""
 
 
-def _verify_subscription_status(access_token: str, user_id: Optional[str]):
+async def _verify_subscription_status(access_token: str, user_id: Optional[str]):
     if not user_id:
         raise SubscriptionVerificationError("User ID is required to verify subscription status.")
-    import requests
 
     headers = {
         'Authorization': f'Bearer {access_token}',
         'Content-Type': 'application/json',
     }
-    response = requests.post(
+    session = await _get_http_session()
+    async with session.post(
         f'{WEBSITE_BASE_URL}/api/subscription-check',
         headers=headers,
         json={'userId': user_id},
-        timeout=30,
-    )
-    if response.status_code != 200:
-        raise SubscriptionVerificationError("Unable to verify subscription status with Nitra servers.")
-
-    payload = response.json()
+        timeout=aiohttp.ClientTimeout(total=30),
+    ) as response:
+        if response.status != 200:
+            raise SubscriptionVerificationError("Unable to verify subscription status with Nitra servers.")
+        payload = await response.json(content_type=None, loads=_jloads)
     if not payload.get('has_paid_subscription'):
         raise SubscriptionVerificationError("An active subscription is required to install premium assets.")
 
 
-def _verify_device_registration(access_token: str, user_id: Optional[str], user_email: Optional[str]):
-    import requests
+async def _fetch_device_slots(headers: Dict[str, str]) -> Tuple[int, Any]:
+    """GET the device slots on the shared aiohttp session; returns (status, parsed body or the parse error)."""
+    session = await _get_http_session()
+    async with session.get(
+        f'{WEBSITE_BASE_URL}/api/device/slots',
+        headers=headers,
+        timeout=aiohttp.ClientTimeout(total=30),
+    ) as response:
+        if response.status >= 400:
+            return response.status, None
+        try:
+            return response.status, await response.json(content_type=None, loads=_jloads)
+        except Exception as exc:
+            return response.status, exc
+
+
+async def _verify_device_registration(access_token: str, user_id: Optional[str], user_email: Optional[str]):
 
     headers = _build_upstream_headers(access_token, user_email, user_id=user_id)
     device_token = headers.get('X-Device-Token')
@@ -3624,33 +3947,23 @@ def _verify_device_registration(access_token: str, user_id: Optional[str], user_
     if not stored_fingerprint:
         raise DeviceVerificationError("Machine fingerprint missing. Restart ComfyUI or re-register this device.")
 
-    response = requests.get(
-        f'{WEBSITE_BASE_URL}/api/device/slots',
-        headers=headers,
-        timeout=30,
-    )
-    if response.status_code == 401:
+    status, payload = await _fetch_device_slots(headers)
+    if status == 401:
         # Try refreshing the token context from the request headers in case the local state is stale.
         debug_log("Device verify: upstream responded 401, attempting to refresh device context from headers.")
         refreshed_headers = _build_upstream_headers(access_token, user_email)
-        response = requests.get(
-            f'{WEBSITE_BASE_URL}/api/device/slots',
-            headers=refreshed_headers,
-            timeout=30,
-        )
-        if response.status_code == 401:
+        status, payload = await _fetch_device_slots(refreshed_headers)
+        if status == 401:
             raise DeviceVerificationError("Authentication expired. Please sign in again.")
-    if response.status_code >= 400:
+    if status >= 400:
         raise DeviceVerificationError("Unable to verify device registration with Nitra servers.")
 
-    try:
-        payload = response.json()
-    except Exception as exc:
-        raise DeviceVerificationError(f"Invalid device verification response: {exc}")
+    if isinstance(payload, Exception):
+        raise DeviceVerificationError(f"Invalid device verification response: {payload}")
 
     devices = payload.get('devices') or []
     debug_log(
-        f"Device verify response: status={response.status_code} "
+        f"Device verify response: status={status} "
         f"count={len(devices)}"
     )
     
@@ -3686,31 +3999,31 @@ def _verify_device_registration(access_token: str, user_id: Optional[str], user_
     raise DeviceVerificationError("This machine is not registered. Register it in the Nitra device settings.")
 
 
-def _require_subscription_and_device(access_token: str, user_id: Optional[str], user_email: Optional[str]):
-    _verify_subscription_status(access_token, user_id)
-    _verify_device_registration(access_token, user_id, user_email)
+async def _require_subscription_and_device(access_token: str, user_id: Optional[str], user_email: Optional[str]):
+    await _verify_subscription_status(access_token, user_id)
+    await _verify_device_registration(access_token, user_id, user_email)
 
 
-def _require_device_registration_only(access_token: str, user_id: Optional[str], user_email: Optional[str]):
-    _verify_device_registration(access_token, user_id, user_email)
+async def _require_device_registration_only(access_token: str, user_id: Optional[str], user_email: Optional[str]):
+    await _verify_device_registration(access_token, user_id, user_email)
 
 
-def _fetch_install_folder_names(access_token: Optional[str], user_email: Optional[str]) -> List[str]:
+async def _fetch_install_folder_names(access_token: Optional[str], user_email: Optional[str]) -> List[str]:
     if not access_token:
         return []
 
     try:
-        import requests
 
         metadata_url = f'{WEBSITE_BASE_URL}/api/models-metadata'
         headers = _build_upstream_headers(access_token, user_email)
-        response = requests.get(metadata_url, headers=headers, timeout=30)
-
-        if response.status_code != 200:
-            logger.warning(f"Nitra: Models metadata request failed ({response.status_code})")
-            return []
-
-        data = response.json()
+        session = await _get_http_session()
+        async with session.get(
+            metadata_url, headers=headers, timeout=aiohttp.ClientTimeout(total=30)
+        ) as response:
+            if response.status != 200:
+                logger.warning(f"Nitra: Models metadata request failed ({response.status})")
+                return []
+            data = await response.json(content_type=None, loads=_jloads)
         if isinstance(data, dict):
             models = data.get('models') or data.get('items') or data.get('data') or []
         elif isinstance(data, list):
@@ -3849,11 +4162,12 @@ def _collect_device_identity() -> Dict[str, Any]:
     return identity
 
 
-def _parse_upstream_json_response(response):
+async def _read_upstream_json_response(response: aiohttp.ClientResponse):
+    """Parse an aiohttp upstream response body as JSON, falling back to {'message': text}."""
+    text = await response.text(errors='replace')
     try:
-        return response.json()
-    except Exception:
-        text = response.text if hasattr(response, 'text') else ''
+        return _jloads(text)
+    except ValueError:
         return {'message': text} if text else {}
 
 
@@ -3862,37 +4176,37 @@ async def get_user_config(request):
     try:
         path = _get_user_config_path()
         if not os.path.exists(path):
-            return web.json_response({'extra_model_paths': [], 'huggingface_token': ''})
+            return _json_response({'extra_model_paths': [], 'huggingface_token': ''})
         data = _read_toml_safe(path)
         # Normalize types
         extra_model_paths = data.get('extra_model_paths') or []
         if not isinstance(extra_model_paths, list):
             extra_model_paths = []
         huggingface_token = data.get('huggingface_token') or ''
-        return web.json_response({
+        return _json_response({
             'extra_model_paths': extra_model_paths,
             'huggingface_token': huggingface_token
         })
     except Exception as e:
         logger.error(f"Nitra: get_user_config error: {e}")
-        return web.json_response({'error': 'Internal server error'}, status=500)
+        return _json_response({'error': 'Internal server error'}, status=500)
 
 
 @routes.post('/nitra/user-config')
 async def save_user_config(request):
     try:
-        data = await request.json()
+        data = _jloads(await request.read())
         extra_model_paths = data.get('extra_model_paths') or []
         huggingface_token = data.get('huggingface_token') or ''
         if not isinstance(extra_model_paths, list):
-            return web.json_response({'error': 'extra_model_paths must be a list'}, status=400)
+            return _json_response({'error': 'extra_model_paths must be a list'}, status=400)
         # Fail fast: ensure all paths are strings, and normalize by stripping
         # Unicode control characters (e.g., U+202A from Windows copy/paste) and
         # surrounding whitespace so the stored config is clean.
         normalized_paths = []
         for p in extra_model_paths:
             if not isinstance(p, str):
-                return web.json_response({'error': 'All extra_model_paths must be strings'}, status=400)
+                return _json_response({'error': 'All extra_model_paths must be strings'}, status=400)
             # Remove control-format characters and trim whitespace
             cleaned = ''.join(
                 ch for ch in p
@@ -3908,7 +4222,7 @@ async def save_user_config(request):
         path = _get_user_config_path()
         ok = _write_toml_safe(path, cfg)
         if not ok:
-            return web.json_response({'error': 'Failed to write configuration'}, status=500)
+            return _json_response({'error': 'Failed to write configuration'}, status=500)
         
         # Always update extra_model_paths.yaml (creates, updates, or deletes based on path)
         # Support for one extra model path - take the first one, or empty string if none
@@ -3917,12 +4231,11 @@ async def save_user_config(request):
             base_path = extra_model_paths[0].strip()
 
         detected_folders: Optional[List[str]] = None
-        auth_header = request.headers.get('Authorization', '')
-        access_token = auth_header[7:] if auth_header and auth_header.startswith('Bearer ') else ''
+        access_token = _extract_bearer(request) or ''
         user_email = request.headers.get('X-User-Email', '')
 
         if base_path and access_token:
-            detected = _fetch_install_folder_names(access_token, user_email)
+            detected = await _fetch_install_folder_names(access_token, user_email)
             detected_folders = detected if detected else None
         elif base_path and not access_token:
             logger.info("Nitra: No auth token provided when saving user config; skipping dynamic folder discovery")
@@ -3931,10 +4244,10 @@ async def save_user_config(request):
         if not yaml_updated:
             logger.warning("Failed to update extra_model_paths.yaml, but config was saved")
         
-        return web.json_response({'success': True})
+        return _json_response({'success': True})
     except Exception as e:
         logger.error(f"Nitra: save_user_config error: {e}")
-        return web.json_response({'error': 'Internal server error'}, status=500)
+        return _json_response({'error': 'Internal server error'}, status=500)
 
 
 @routes.get('/nitra/device/identity')
@@ -3952,21 +4265,18 @@ async def get_device_identity(request):
                 'registered_at': device_state.get('registered_at'),
                 'fingerprint_hash': device_state.get('fingerprint_hash')
             }
-        return web.json_response(identity)
+        return _json_response(identity)
     except Exception as e:
         logger.error(f"Nitra: device identity error: {e}")
-        return web.json_response({'error': 'Failed to collect device identity'}, status=500)
+        return _json_response({'error': 'Failed to collect device identity'}, status=500)
 
 
 @routes.get('/nitra/debug/device-status')
+@require_bearer(allow_empty=True)
 async def debug_device_status(request):
     """Return local vs remote device info to help troubleshoot device checks."""
     try:
-        auth_header = request.headers.get('Authorization', '')
-        if not auth_header.startswith('Bearer '):
-            return web.json_response({'error': 'Missing bearer token'}, status=401)
-
-        access_token = auth_header[7:]
+        access_token = request['access_token']
         user_email = request.headers.get('X-User-Email')
         user_id = request.headers.get('X-User-Id')
         headers = _build_upstream_headers(access_token, user_email, user_id=user_id)
@@ -3975,21 +4285,22 @@ async def debug_device_status(request):
         identity = _collect_device_identity()
 
         upstream_status: Dict[str, Any]
-        import requests
         try:
-            resp = requests.get(
+            session = await _get_http_session()
+            async with session.get(
                 f'{WEBSITE_BASE_URL}/api/device/slots',
                 headers=headers,
-                timeout=30,
-            )
-            try:
-                body = resp.json()
-            except Exception:
-                body = resp.text
-            upstream_status = {
-                'status': resp.status_code,
-                'body': body,
-            }
+                timeout=aiohttp.ClientTimeout(total=30),
+            ) as resp:
+                text = await resp.text(errors='replace')
+                try:
+                    body = _jloads(text)
+                except ValueError:
+                    body = text
+                upstream_status = {
+                    'status': resp.status,
+                    'body': body,
+                }
         except Exception as exc:
             upstream_status = {
                 'status': 'error',
@@ -4006,24 +4317,22 @@ async def debug_device_status(request):
             'user_email': user_email or device_state.get('user_email'),
         }
 
-        return web.json_response({
+        return _json_response({
             'local_state': local_summary,
             'upstream': upstream_status,
         })
     except Exception as exc:
         logger.error(f"Nitra: debug device status error: {exc}")
-        return web.json_response({'error': 'Failed to gather device status'}, status=500)
+        return _json_response({'error': 'Failed to gather device status'}, status=500)
 
 
 @routes.get('/nitra/device/registrations')
+@require_bearer(allow_empty=True)
 async def list_device_registrations(request):
-    auth_header = request.headers.get('Authorization', '')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        return web.json_response({'error': 'Unauthorized'}, status=401)
+    auth_header = request.headers['Authorization']  # already validated by require_bearer
     user_email = request.headers.get('X-User-Email', '')
     user_id = request.headers.get('X-User-Id', '')
     try:
-        import requests
         url = f"{WEBSITE_BASE_URL}/api/device/slots"
         headers = {
             'Authorization': auth_header,
@@ -4033,22 +4342,23 @@ async def list_device_registrations(request):
             headers['X-User-Email'] = user_email
         if user_id:
             headers['X-User-Id'] = user_id
-        resp = requests.get(url, headers=headers, timeout=30)
-        data = _parse_upstream_json_response(resp)
-        return web.json_response(data, status=resp.status_code)
+        session = await _get_http_session()
+        async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=30)) as resp:
+            data = await _read_upstream_json_response(resp)
+            status = resp.status
+        return _json_response(data, status=status)
     except Exception as e:
         logger.error(f"Nitra: device registrations error: {e}")
-        return web.json_response({'error': 'Failed to fetch device registrations'}, status=500)
+        return _json_response({'error': 'Failed to fetch device registrations'}, status=500)
 
 
 @routes.post('/nitra/device/register')
+@require_bearer(allow_empty=True)
 async def register_device(request):
-    auth_header = request.headers.get('Authorization', '')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        return web.json_response({'error': 'Unauthorized'}, status=401)
+    auth_header = request.headers['Authorization']  # already validated by require_bearer
     user_email = request.headers.get('X-User-Email', '')
     try:
-        payload = await request.json()
+        payload = _jloads(await request.read())
     except Exception:
         payload = {}
 
@@ -4078,7 +4388,6 @@ async def register_device(request):
         if device_state.get('fingerprint_hash'):
             upstream_payload['storedFingerprintHash'] = device_state.get('fingerprint_hash')
 
-        import requests
         url = f"{WEBSITE_BASE_URL}/api/device/register"
         headers = {
             'Authorization': auth_header,
@@ -4090,11 +4399,15 @@ async def register_device(request):
         if fingerprint_hash:
             headers['X-Device-Fingerprint'] = fingerprint_hash
 
-        resp = requests.post(url, headers=headers, json=upstream_payload, timeout=45)
-        resp_body = _parse_upstream_json_response(resp)
+        session = await _get_http_session()
+        async with session.post(
+            url, headers=headers, json=upstream_payload, timeout=aiohttp.ClientTimeout(total=45)
+        ) as resp:
+            resp_body = await _read_upstream_json_response(resp)
+            resp_ok, resp_status = resp.ok, resp.status
 
         stored_token = resp_body.pop('deviceToken', None)
-        if resp.ok and stored_token and resp_body.get('deviceId'):
+        if resp_ok and stored_token and resp_body.get('deviceId'):
             entry_id = resp_body.get('deviceId') or fingerprint_hash or 'nitra-device'
             stored_securely = _store_device_token_secure(entry_id, stored_token)
             if not stored_securely:
@@ -4107,23 +4420,22 @@ async def register_device(request):
                 'machine_name': identity.get('machine_name'),
                 'secure_entry_id': entry_id
             })
-        elif resp.ok and resp_body.get('status') == 'device-unregistered':
+        elif resp_ok and resp_body.get('status') == 'device-unregistered':
             _write_device_state(None)
 
-        return web.json_response(resp_body, status=resp.status_code)
+        return _json_response(resp_body, status=resp_status)
     except Exception as e:
         logger.error(f"Nitra: device register error: {e}")
-        return web.json_response({'error': 'Failed to register device'}, status=500)
+        return _json_response({'error': 'Failed to register device'}, status=500)
 
 
 @routes.post('/nitra/telemetry/login')
+@require_bearer(allow_empty=True)
 async def telemetry_login(request):
-    auth_header = request.headers.get('Authorization', '')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        return web.json_response({'error': 'Unauthorized'}, status=401)
+    auth_header = request.headers['Authorization']  # already validated by require_bearer
     user_email = request.headers.get('X-User-Email', '')
     try:
-        body = await request.json()
+        body = _jloads(await request.read())
     except Exception:
         body = {}
 
@@ -4142,7 +4454,6 @@ async def telemetry_login(request):
             'context': body.get('context', {})
         }
 
-        import requests
         url = f"{WEBSITE_BASE_URL}/api/telemetry/login"
         headers = {
             'Authorization': auth_header,
@@ -4154,46 +4465,16 @@ async def telemetry_login(request):
         if fingerprint_hash:
             headers['X-Device-Fingerprint'] = fingerprint_hash
 
-        resp = requests.post(url, headers=headers, json=telemetry_payload, timeout=30)
-        resp_body = _parse_upstream_json_response(resp)
-        return web.json_response(resp_body, status=resp.status_code)
+        session = await _get_http_session()
+        async with session.post(
+            url, headers=headers, json=telemetry_payload, timeout=aiohttp.ClientTimeout(total=30)
+        ) as resp:
+            resp_body = await _read_upstream_json_response(resp)
+            status = resp.status
+        return _json_response(resp_body, status=status)
     except Exception as e:
         logger.error(f"Nitra: telemetry login error: {e}")
-        return web.json_response({'error': 'Failed to record telemetry'}, status=500)
-
-@routes.get('/nitra/custom-nodes')
-async def get_custom_nodes(request):
-    """Get all active custom nodes from admin subdomain"""
-    try:
-        # Basic auth check (similar to existing model/workflow routes)
-        auth_header = request.headers.get('Authorization', '')
-        if not auth_header.startswith('Bearer '):
-            return web.json_response({"error": "Missing or invalid authorization header"}, status=401)
-        
-        access_token = auth_header[7:]
-        if not access_token:
-            return web.json_response({"error": "Missing access token"}, status=401)
-        
-        user_email = request.query.get('userEmail', '')
-        if not user_email: # Fallback to decode JWT token
-            import base64, json as json_lib
-            token_parts = access_token.split('.')
-            if len(token_parts) != 3: return web.json_response({"error": "Invalid token format"}, status=401)
-            payload_b64 = token_parts[1]
-            payload_b64 += '=' * (4 - len(payload_b64) % 4)
-            payload = json_lib.loads(base64.b64decode(payload_b64))
-            user_email = payload.get('email') or payload.get('user_email', '')
-        
-        import requests
-        custom_nodes_url = f'{WEBSITE_BASE_URL}/api/custom-nodes' # Target upstream API
-        headers = _build_upstream_headers(access_token, user_email)
-        response = requests.get(custom_nodes_url, headers=headers, timeout=30)
-        response.raise_for_status()
-        custom_nodes_data = response.json()
-        return web.json_response(custom_nodes_data)
-    except Exception as e:
-        logger.error(f"Nitra: Custom nodes fetch error: {e}")
-        return web.json_response({"error": "Internal server error"}, status=500)
+        return _json_response({'error': 'Failed to record telemetry'}, status=500)
 
 @routes.get('/nitra/node-mappings')
 async def get_node_mappings(request):
@@ -4207,12 +4488,12 @@ async def get_node_mappings(request):
         if os.path.exists(manager_map_path):
             with open(manager_map_path, 'r', encoding='utf-8') as f:
                 node_mappings = json.load(f)
-            return web.json_response(node_mappings)
+            return _json_response(node_mappings)
         else:
             logger.warning(f"Nitra: extension-node-map.json not found at {manager_map_path}")
-            return web.json_response({})
+            return _json_response({})
     except Exception as e:
         logger.error(f"Nitra: Failed to load node mappings: {e}")
-        return web.json_response({})
+        return _json_response({})
 
 debug_log("Routes registered successfully")
\ No newline at end of file
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Nitra Script Wrapper
+Runs a downloaded Nitra script with web/ (setup_modules) and the script's temp
+directory importable. Everything task-specific arrives through NITRA_* environment
+variables, so this file never changes between tasks and its bytecode can be cached.
+
+Each task still gets a fresh interpreter rather than a long-lived worker: the
+scripts run as __main__, may call sys.exit() or leave threads and module state
+behind, and cancelling a task means terminating its process.
+"""
+
+import os
+import runpy
+import sys
+
+
+def main():
+    web_dir = os.environ['NITRA_WEB_DIR']
+    script_path = os.environ['NITRA_SCRIPT_PATH']
+    script_temp_dir = os.path.dirname(script_path)
+
+    # web_dir first for setup_modules, then the temp dir for sibling downloads (model_downloads.py)
+    sys.path.insert(0, web_dir)
+    sys.path.insert(1, script_temp_dir)
+
+    # The ID list is handed over as a JSON file so it never has to be quoted or escaped
+    with open(os.environ['NITRA_IDS_FILE'], 'r', encoding='utf-8') as f:
+        ids_json = f.read()
+
+    argv = [script_path, ids_json]
+    hf_token = os.environ.get('NITRA_HF_TOKEN')
+    if hf_token:
+        argv.append(hf_token)
+    sys.argv = argv
+
+    runpy.run_path(script_path, run_name='__main__')
+
+
+if __name__ == "__main__":
+    main()
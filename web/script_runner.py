@@ -4,16 +4,16 @@ Script Runner Utility
 Downloads, runs, and cleans up Python scripts from S3 with local testing support
 """
 
+import io
 import os
 import sys
-import json
+import hashlib
 import requests
 import tempfile
 import subprocess
 import signal
 import shutil
 from typing import List, Dict, Optional, Any
-from urllib.parse import urlparse
 
 # Add the setup_modules directory to the path
 sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'setup_modules'))
@@ -21,6 +21,14 @@ sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'set
 from setup_modules.logging_setup import setup_logging
 from setup_modules.config import load_config, setup_environment
 
+# Downloaded scripts are kept here (with their S3 ETag) so repeat runs can revalidate
+# with a conditional GET instead of transferring the script again
+SCRIPT_CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+    'nitra',
+    'scripts'
+)
+
 
 class ScriptRunner:
     """Utility class for downloading, running, and cleaning up Python scripts"""
@@ -133,6 +141,11 @@ class ScriptRunner:
                 self.logger.error("No access token available for API call")
                 return False
                 
+            self.script_path = os.path.join(self.temp_dir, f"{script_name}.py")
+            # The API is asked every time (so revoked access and new releases take effect at
+            # once); the cache only saves the transfer when the presigned GET returns 304
+            cached_path, cached_etag = self._get_cached_script(script_name)
+            
             headers = {
                 'Authorization': f'Bearer {token}',
                 'Content-Type': 'application/json'
@@ -149,15 +162,22 @@ class ScriptRunner:
                 return False
             
             # Download the script using presigned URL
-            self.script_path = os.path.join(self.temp_dir, f"{script_name}.py")
-            
-            script_response = requests.get(download_url, stream=True, timeout=300)
-            script_response.raise_for_status()
+            request_headers = {'If-None-Match': cached_etag} if cached_etag else None
             
-            with open(self.script_path, 'wb') as f:
-                for chunk in script_response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
+            script_response = requests.get(download_url, stream=True, timeout=300, headers=request_headers)
+            if script_response.status_code == 304 and cached_path:
+                # Unchanged since the last download - reuse the cached copy
+                script_response.close()
+                shutil.copyfile(cached_path, self.script_path)
+            else:
+                script_response.raise_for_status()
+                
+                with open(self.script_path, 'wb') as f:
+                    for chunk in script_response.iter_content(chunk_size=8192):
+                        if chunk:
+                            f.write(chunk)
+                
+                self._store_cached_script(script_name, script_response.headers.get('ETag'))
             
             # Make script executable
             os.chmod(self.script_path, 0o755)
@@ -168,6 +188,60 @@ class ScriptRunner:
             self.logger.error(f"Failed to download script from S3: {e}")
             return False
     
+    def _script_cache_base(self, script_name: str) -> str:
+        """Cache path prefix for a script, keyed by the API it came from as well as its name"""
+        source = hashlib.blake2b(self.configs_url.encode('utf-8'), digest_size=8).hexdigest()
+        return os.path.join(SCRIPT_CACHE_DIR, f"{script_name}-{source}")
+    
+    def _get_cached_script(self, script_name: str):
+        """Return (path, etag) of the cached copy of a script, or (None, None)"""
+        cache_base = self._script_cache_base(script_name)
+        cached_path = cache_base + ".py"
+        etag_path = cache_base + ".etag"
+        try:
+            with open(etag_path, 'r', encoding='utf-8') as f:
+                etag = f.read().strip()
+        except OSError:
+            return None, None
+        if not etag or not os.path.isfile(cached_path):
+            return None, None
+        return cached_path, etag
+    
+    def _store_cached_script(self, script_name: str, etag: Optional[str]) -> bool:
+        """Save the freshly downloaded script and its ETag to the script cache; True if cached"""
+        if not etag:
+            return False
+        try:
+            os.makedirs(SCRIPT_CACHE_DIR, exist_ok=True)
+            cache_base = self._script_cache_base(script_name)
+            cached_path = cache_base + ".py"
+            etag_path = cache_base + ".etag"
+            # Write to temp files and os.replace() so readers never see a partial script;
+            # the script goes first so a stale ETag can only ever force a re-download
+            with open(self.script_path, 'rb') as f:
+                self._replace_cache_file(cached_path, f.read())
+            self._replace_cache_file(etag_path, etag.encode('utf-8'))
+            return True
+        except OSError as e:
+            self.logger.warning(f"Failed to cache script {script_name}: {e}")
+            return False
+    
+    @staticmethod
+    def _replace_cache_file(path: str, content: bytes):
+        """Atomically replace a cache file via a temp file unique to this writer"""
+        # mkstemp gives every concurrent writer (threads included) its own temp file
+        fd, tmp_path = tempfile.mkstemp(dir=SCRIPT_CACHE_DIR, prefix=os.path.basename(path) + '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+    
     def run_script(self, args: List[str] = None) -> Dict[str, Any]:
         """
         Run the downloaded script with the given arguments
@@ -225,50 +299,50 @@ class ScriptRunner:
                 cmd,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
-                text=True,
                 cwd=web_dir,
-                env=env,
-                bufsize=1,
-                universal_newlines=True
+                env=env
             )
             
             # Store process for external cancellation
             self.current_process = process
             
+            # Decode with newline='' so line endings are kept as-is: readline() still splits on
+            # '\r', but a bare '\r' ending now tells a progress refresh apart from a real line
+            stream = io.TextIOWrapper(process.stdout, encoding='utf-8', errors='replace', newline='')
+            
             # Capture output in real-time with special handling for progress bars
             output_lines = []
             last_was_progress = False
             
-            while True:
-                output = process.stdout.readline()
-                if output == '' and process.poll() is not None:
-                    break
-                if output:
-                    stripped = output.strip()
-                    if not stripped:
-                        continue
-                    
+            for output in iter(stream.readline, ''):
+                stripped = output.strip()
+                if not stripped:
+                    continue
+                
+                is_refresh = output.endswith('\r')
+                if not is_refresh:
+                    # In-place refreshes are superseded by the next one, so only keep real lines
                     output_lines.append(stripped)
-                    
-                    # Detect tqdm-style progress bars (contain %| or progress indicators)
-                    is_progress = '%|' in stripped or (
-                        any(c in stripped for c in ['|', '#']) and 
-                        '%' in stripped and 
-                        ('/' in stripped or 'B/s' in stripped or 'it/s' in stripped)
-                    )
-                    
-                    if is_progress:
-                        # Write progress directly to stderr with carriage return for in-place updates
-                        sys.stderr.write(f'\r{stripped}')
+                
+                # Detect tqdm-style progress bars (contain %| or progress indicators)
+                is_progress = is_refresh or '%|' in stripped or (
+                    any(c in stripped for c in ['|', '#']) and 
+                    '%' in stripped and 
+                    ('/' in stripped or 'B/s' in stripped or 'it/s' in stripped)
+                )
+                
+                if is_progress:
+                    # Write progress directly to stderr with carriage return for in-place updates
+                    sys.stderr.write(f'\r{stripped}')
+                    sys.stderr.flush()
+                    last_was_progress = True
+                else:
+                    # For non-progress output, ensure we're on a new line first
+                    if last_was_progress:
+                        sys.stderr.write('\n')
                         sys.stderr.flush()
-                        last_was_progress = True
-                    else:
-                        # For non-progress output, ensure we're on a new line first
-                        if last_was_progress:
-                            sys.stderr.write('\n')
-                            sys.stderr.flush()
-                            last_was_progress = False
-                        self.logger.info(stripped)
+                        last_was_progress = False
+                    self.logger.info(stripped)
             
             # Ensure final newline if we ended on a progress bar
             if last_was_progress:
@@ -276,7 +350,7 @@ class ScriptRunner:
                 sys.stderr.flush()
             
             # Get return code
-            return_code = process.poll()
+            return_code = process.wait()
             
             # Create result object similar to subprocess.run
             class Result: